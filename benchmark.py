@@ -0,0 +1,326 @@
+"""Benchmarks for the Excel Automation Tool.
+
+Generates synthetic meter exports shaped like the real ones (banner rows, an optional
+"Information Requiring Your Attention" block, the Timestamp header, interval readings with
+register rollovers and gaps, Nitrogen and IESO-and-Hospital layouts) and times
+format_excel, handle_nitrogen_file, the master workbook build and a full main() batch at
+several scales.
+
+    python benchmark.py                      # small + medium
+    python benchmark.py --scales large year  # bigger exports
+    python benchmark.py --json results.json  # also save the numbers for comparing runs
+
+Everything runs inside a throwaway OneDrive folder, so real data is never touched.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from openpyxl import Workbook
+
+import main
+
+# Scratch OneDrive folder the tool is pointed at for the whole benchmark
+BENCH_ROOT = tempfile.mkdtemp(prefix="excel_automation_bench_")
+
+
+# name: (meters per export, interval minutes, months, exports per batch)
+SCALES = {
+    "small": (10, 15, 1, 8),
+    "medium": (50, 15, 1, 8),
+    "large": (150, 15, 1, 8),
+    "year": (20, 15, 12, 4),
+}
+
+METER_UNITS = ["kWh", "m3", "kW", "GJ"]
+START = datetime(2025, 6, 1)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic exports
+# ---------------------------------------------------------------------------
+
+def meter_names(count, building_no):
+    names = []
+    for k in range(count):
+        unit = METER_UNITS[k % len(METER_UNITS)]
+        names.append(f"{building_no:02d}.{k // 10 + 1:02d}ME{k + 1} Meter {k + 1} ({unit})")
+    return names
+
+
+def interval_times(interval, months, start=START):
+    """Timestamps from 00:15 on the 1st through 00:00 on the 1st after the last month."""
+    end = start
+    for _ in range(months):
+        end = (end.replace(day=28) + timedelta(days=4)).replace(day=1)
+    count = int((end - start) / timedelta(minutes=interval))
+    return [start + timedelta(minutes=interval * (n + 1)) for n in range(count)]
+
+
+def write_meter_export(path, meters, interval=15, months=1, banner_rows=4, irya=False,
+                       rollovers=1, gap_rate=0.002, text_timestamps=True, empty_cols=1, seed=0):
+    """Write an interval export like the ones dropped into Pre-Updated.
+
+    Every meter counts up from a random start; `rollovers` meters wrap past their register size
+    part way through and roughly `gap_rate` of readings are left blank. Returns the data row count.
+    """
+    rng = random.Random(seed)
+    times = interval_times(interval, months)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append([f"Energy Report - {os.path.splitext(os.path.basename(path))[0]}"])
+    for i in range(banner_rows - 1):
+        ws.append([f"Report line {i + 1}", None, "Generated" if i == 0 else None])
+    if irya:
+        ws.append([main.IRYA_TEXT])
+        ws.append(["Some readings were estimated", None])
+    ws.append(["Timestamp"] + meters + [None] * empty_cols)
+
+    values = [rng.randint(1_000, 90_000) for _ in meters]
+    registers = [10 ** len(str(v)) for v in values]
+    wrap_at = {k: rng.randrange(1, len(times)) for k in rng.sample(range(len(meters)), min(rollovers, len(meters)))}
+    for n, t in enumerate(times):
+        row = [t.strftime("%m/%d/%Y %I:%M %p") if text_timestamps else t]
+        for k in range(len(values)):
+            values[k] += rng.randint(0, 5)
+            if wrap_at.get(k) == n:
+                values[k] = rng.randint(0, 50)
+            elif values[k] >= registers[k]:
+                values[k] -= registers[k]
+            row.append(None if rng.random() < gap_rate else values[k])
+        ws.append(row + [None] * empty_cols)
+    wb.save(path)
+    return len(times)
+
+
+def write_nitrogen_export(path, meters, days=30, seed=0):
+    """Write a Nitrogen-style export: title row, header row, one reading per day and a totals row."""
+    rng = random.Random(seed)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(["Nitrogen Plant", None, START.strftime("%B")])
+    ws.append(["Timestamp"] + [f"N2 Meter {k + 1}" for k in range(meters)] + [None])
+    totals = [0.0] * meters
+    for d in range(days):
+        flows = [rng.random() * 100 + 1 for _ in range(meters)]
+        totals = [a + b for a, b in zip(totals, flows)]
+        ws.append([(START + timedelta(days=d)).strftime("%Y-%m-%d")] + flows + [None])
+    ws.append(["Total"] + totals + [None])
+    wb.save(path)
+    return days
+
+
+def write_ieso_export(path, meters, interval=15, months=1, seed=0):
+    """Write an IESO-and-Hospital export: the IESO and Hospital feeders plus `meters` extras."""
+    feeders = ["12T1Q1 IESO Feed A (kWh)", "12T2Q3 IESO Feed B (kWh)",
+               "12M14A Hospital Main (kWh)", "12M21 Hospital Aux (kWh)"]
+    return write_meter_export(path, feeders + meter_names(max(0, meters - len(feeders)), 12),
+                              interval=interval, months=months, seed=seed)
+
+
+def build_batch(folder, scale, seed=0):
+    """Fill `folder` with a mixed batch of exports at the given scale.
+
+    Returns [(file name, data rows), ...].
+    """
+    meters, interval, months, count = SCALES[scale]
+    batch = []
+    for n in range(count):
+        kind = n % 4
+        if kind == 0:
+            name = f"Residence - Hall {n} Report.xlsx"
+            rows = write_meter_export(os.path.join(folder, name), meter_names(meters, n), interval, months,
+                                      irya=n % 8 == 0, seed=seed + n)
+        elif kind == 1:
+            name = f"Building {n} Cogen.xlsx"
+            rows = write_meter_export(os.path.join(folder, name), meter_names(meters, n), interval, months,
+                                      banner_rows=2, text_timestamps=False, rollovers=2, seed=seed + n)
+        elif kind == 2:
+            name = f"IESO and Hospital {n}.xlsx"
+            rows = write_ieso_export(os.path.join(folder, name), meters, interval, months, seed=seed + n)
+        else:
+            name = f"Nitrogen {n}.xlsx"
+            rows = write_nitrogen_export(os.path.join(folder, name), max(2, meters // 10), seed=seed + n)
+        batch.append((name, rows))
+    return batch
+
+
+def synthetic_master_data(buildings, meters, seed=0):
+    rng = random.Random(seed)
+    master_data = main.MasterData()
+    for b in range(buildings):
+        for k in range(meters):
+            master_data.append(f"Building {b}", f"{b:02d}.01ME{k + 1}", round(rng.random() * 100_000, 2),
+                               f"Building {b}.xlsx", START.strftime("%B"), "complete")
+    return master_data
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def measure(func, repeat, memory=True):
+    """Best wall time over `repeat` calls, plus peak traced memory (MB) from one extra call.
+
+    The tool's own progress prints are silenced while it runs.
+    """
+    best = float("inf")
+    peak_mb = None
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                func()
+                best = min(best, time.perf_counter() - started)
+
+            if memory:
+                tracemalloc.start()
+                try:
+                    func()
+                    peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+                finally:
+                    tracemalloc.stop()
+        finally:
+            sys.stdout = stdout
+    return best, peak_mb
+
+
+def clear_folder(folder):
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def bench_scale(scale, repeat, memory):
+    meters, interval, months, _ = SCALES[scale]
+    results = []
+    source = tempfile.mkdtemp(dir=BENCH_ROOT, prefix=f"source_{scale}_")
+    work = tempfile.mkdtemp(dir=BENCH_ROOT, prefix=f"work_{scale}_")
+    batch = build_batch(source, scale)
+    today_str, time_str, bill_month = "2025-07-02", "09-30", "July"
+
+    def record(stage, seconds, peak_mb, rows=None, files=None):
+        result = {"scale": scale, "stage": stage, "seconds": round(seconds, 4),
+                  "peak_mb": None if peak_mb is None else round(peak_mb, 1)}
+        if rows is not None:
+            result["rows_per_s"] = round(rows / seconds, 1)
+        if files is not None:
+            result["files_per_s"] = round(files / seconds, 2)
+        results.append(result)
+        print(f"  {stage:<28} {seconds:8.3f}s"
+              f"{'' if rows is None else f'  {rows / seconds:12,.0f} rows/s'}"
+              f"{'' if files is None else f'  {files / seconds:8.2f} files/s'}"
+              f"{'' if peak_mb is None else f'  {peak_mb:8.1f} MB peak'}")
+
+    # format_excel on the first export of each interval layout
+    timed = set()
+    for name, rows in batch:
+        label = "format_excel (IESO)" if name.startswith("IESO") else \
+                "format_excel (datetime)" if "Cogen" in name else "format_excel"
+        if name.startswith("Nitrogen") or label in timed:
+            continue
+        timed.add(label)
+        path = os.path.join(source, name)
+        building = main.clean_building_name(name)
+        seconds, peak_mb = measure(lambda: main.format_excel(path, work, main.MasterData(), building, today_str, bill_month, time_str),
+                                   repeat, memory)
+        record(label, seconds, peak_mb, rows=rows, files=1)
+        clear_folder(work)
+
+    # Each installed reader engine on the first plain meter export
+    name, rows = next(item for item in batch if not item[0].startswith(("Nitrogen", "IESO")) and "Cogen" not in item[0])
+    path = os.path.join(source, name)
+    for engine in main.reader_order(".xlsx"):
+        read_rows = main.READER_ENGINES[engine].read_rows
+        seconds, peak_mb = measure(lambda: main.collect_export(read_rows(path)), repeat, memory)
+        record(f"read ({engine})", seconds, peak_mb, rows=rows, files=1)
+
+    # The same export saved as CSV, read through the direct CSV path
+    csv_path = os.path.splitext(path)[0] + ".csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(["" if v is None else v for v in row] for row in main.openpyxl_rows(path))
+    seconds, peak_mb = measure(lambda: main.read_delimited_export(csv_path), repeat, memory)
+    record("read (csv)", seconds, peak_mb, rows=rows, files=1)
+    os.remove(csv_path)
+
+    # handle_nitrogen_file
+    name, rows = next(item for item in batch if item[0].startswith("Nitrogen"))
+    path = os.path.join(source, name)
+    seconds, peak_mb = measure(lambda: main.handle_nitrogen_file(path, work, main.clean_building_name(name),
+                                                                 today_str, bill_month, time_str, main.MasterData()),
+                               repeat, memory)
+    record("handle_nitrogen_file", seconds, peak_mb, rows=rows, files=1)
+    clear_folder(work)
+
+    # Master workbook build from a synthetic master_data list
+    master_data = synthetic_master_data(buildings=40, meters=meters)
+    master_path = os.path.join(work, "Final.xlsx")
+    seconds, peak_mb = measure(lambda: main.write_master_workbook(master_data, master_path), repeat, memory)
+    record("write_master_workbook", seconds, peak_mb, rows=len(master_data))
+    clear_folder(work)
+
+    # Full main() over the whole batch; main() consumes Pre-Updated so it is refilled each time, and the
+    # ledger and parse cache are cleared so every repeat does the full work
+    def run_batch():
+        for folder in [main.PRE_UPDATED, main.INTERMEDIATE_FOLDER, main.OUTPUT_FOLDER, main.PARSE_CACHE_FOLDER]:
+            clear_folder(folder)
+        if os.path.exists(main.LEDGER_PATH):
+            os.remove(main.LEDGER_PATH)
+        for name, _ in batch:
+            shutil.copyfile(os.path.join(source, name), os.path.join(main.PRE_UPDATED, name))
+        main.main()
+
+    seconds, peak_mb = measure(run_batch, repeat, memory)
+    record(f"main() x{len(batch)} files", seconds, peak_mb,
+           rows=sum(rows for _, rows in batch), files=len(batch))
+    for folder in [main.PRE_UPDATED, main.INTERMEDIATE_FOLDER, main.OUTPUT_FOLDER]:
+        clear_folder(folder)
+
+    shutil.rmtree(source)
+    shutil.rmtree(work)
+    return results
+
+
+def run_benchmarks(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Excel Automation Tool on synthetic exports.")
+    parser.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage; the best one is reported")
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra traced run used for peak memory")
+    parser.add_argument("--json", metavar="PATH", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    for folder in ["Pre-Updated", "Intermediate Folder", "Output"]:
+        os.makedirs(os.path.join(BENCH_ROOT, "Excel Automation Tool", folder), exist_ok=True)
+    # Everything the tool writes, the meter history included, stays under BENCH_ROOT
+    main.configure(BENCH_ROOT, workers=1, scratch_root=os.path.join(BENCH_ROOT, "Scratch"),
+                   data_root=os.path.join(BENCH_ROOT, "Data"))
+
+    results = []
+    try:
+        for scale in args.scales:
+            meters, interval, months, count = SCALES[scale]
+            print(f"\n{scale}: {meters} meters, {interval}-minute intervals, {months} month(s), {count} files")
+            results.extend(bench_scale(scale, max(1, args.repeat), not args.no_memory))
+    finally:
+        shutil.rmtree(BENCH_ROOT, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=1)
+    return results
+
+
+if __name__ == "__main__":
+    run_benchmarks()
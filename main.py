@@ -1,66 +1,374 @@
+import time
+
+STARTED = time.perf_counter()  # when main.py began loading, for the startup-time figure
+
 import os
 import re
 import math
-import pandas as pd
+import json
+import shutil
+import hashlib
 import logging
-from openpyxl import load_workbook
-from openpyxl.styles import Alignment, PatternFill, Font
-from openpyxl.utils import get_column_letter
-from openpyxl.worksheet.table import Table, TableStyleInfo
-from datetime import datetime
-from dateutil.parser import parse
-from uuid import uuid4
+import logging.handlers
+import sqlite3
+import tempfile
+import zipfile
+from array import array
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from collections import namedtuple
 
+# numpy, pandas, openpyxl and dateutil are imported inside the functions that use them, so the
+# tool starts (and can report a bad OneDrive setup) without waiting on them
 
-# Get OneDrive root path
-onedrive_root = os.environ.get("OneDrive")
-if not onedrive_root:
-    raise EnvironmentError("❌ OneDrive path not found. Please ensure OneDrive is set up on this user account.")
 
-# Log folder path using OneDrive
-LOG_FOLDER = os.path.join(onedrive_root, "Excel Automation Tool", "Logs")
-os.makedirs(LOG_FOLDER, exist_ok=True)
-master_log_path = os.path.join(LOG_FOLDER, "master_log.txt")
+EMOJI_PATTERN = re.compile(r'[^\x00-\x7F]+')
 
 
 class EmojiFilter(logging.Filter):
     def filter(self, record):
-        record.msg = re.sub(r'[^\x00-\x7F]+', '', str(record.msg))
+        record.msg = EMOJI_PATTERN.sub('', str(record.msg))
         return True
 
-formatter = logging.Formatter('[%(asctime)s] %(levelname)s - %(message)s')
 
-# File handler - this will log to a file and strip emojis
-file_handler = logging.FileHandler(master_log_path, mode='a', encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(formatter)
-file_handler.addFilter(EmojiFilter())
+# Folder and file paths are filled in by configure() when the tool runs, not at import time
+PRE_UPDATED = None
+INTERMEDIATE_FOLDER = None
+OUTPUT_FOLDER = None
+LOG_FOLDER = None
+LEDGER_PATH = None
+METRICS_PATH = None
+SCRATCH_ROOT = None  # local folder where each run does its work before publishing to OneDrive
+PARSE_CACHE_FOLDER = None  # parsed exports saved by file hash, under SCRATCH_ROOT
+DATA_ROOT = None  # local folder for data kept between runs that must not sit in OneDrive
+HISTORY_PATH = None  # SQLite database of monthly usage per meter from every run, under DATA_ROOT
+READER_CHOICE_PATH = None  # reader engine ranking measured on this machine, under DATA_ROOT
+
+# Spreadsheet reader engines to try first, per file type (e.g. {".xlsx": ["calamine", "openpyxl"]})
+READER_CHOICE = {}
+
+# Number of worker processes used for the per-file loop (1 = run serially in this process)
+MAX_WORKERS = int(os.environ.get("EXCEL_AUTOMATION_WORKERS") or os.cpu_count() or 1)
+
+# Remembers the results for every export already processed, keyed by a hash of its contents
+LEDGER_VERSION = 6  # bump when a change alters usage results so older entries get recomputed
+LEDGER_DAYS = 120  # entries not produced or reused for this long are dropped
+
+# Year-over-year check: usage is compared with the mean of the same month in up to ABNORMAL_YEARS
+# earlier years and flagged when it is ABNORMAL_HIGH above or ABNORMAL_LOW below that (0.5 = 50%).
+# Baselines smaller than ABNORMAL_MIN_BASELINE are too small to compare against.
+ABNORMAL_YEARS = 3
+ABNORMAL_HIGH = 0.5
+ABNORMAL_LOW = 0.5
+ABNORMAL_MIN_BASELINE = 1.0
+
+PARSE_CACHE_VERSION = 1  # bump when the loader changes what it produces for the same file
+PARSE_CACHE_DAYS = 120  # parsed exports not used for this long are deleted
+
+# master_log.txt rolls over at this size; older logs are kept gzipped as master_log.txt.1.gz, .2.gz, ...
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 10
+
+# Queue every process logs into and the background thread that writes it to master_log.txt
+LOG_QUEUE = None
+LOG_LISTENER = None
 
-# Console handler - you said you don't want extra logs in console, so we leave it out of basicConfig
-# (Leaving this here in case you ever want to enable both)
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(formatter)
+SLOWEST_SHOWN = 5  # files listed in the end-of-run timing summary
+STARTUP_BUDGET = 1.0  # seconds; startup slower than this is called out
 
-logging.basicConfig(level=logging.INFO, handlers=[file_handler])
+# Watch mode scans Pre-Updated every WATCH_INTERVAL seconds and picks up an export once it has sat
+# unchanged for WATCH_SETTLE seconds, so files still being copied or synced are left alone
+WATCH_INTERVAL = 5
+WATCH_SETTLE = 30
 
 
-# File Paths
-onedrive_root = os.environ.get("OneDrive")
-if not onedrive_root:
-    raise EnvironmentError("❌ OneDrive path not found. Please ensure OneDrive is set up on this user account.")
+def compress_log(source, dest):
+    # Rotator for master_log.txt: the rolled-over log is kept gzipped
+    import gzip
 
-# Defined folder paths for folders 
-PRE_UPDATED = os.path.join(onedrive_root, "Excel Automation Tool", "Pre-Updated")
-INTERMEDIATE_FOLDER = os.path.join(onedrive_root, "Excel Automation Tool", "Intermediate Folder")
-OUTPUT_FOLDER = os.path.join(onedrive_root, "Excel Automation Tool", "Output")
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
 
-# Check that required folders exist
-for path in [PRE_UPDATED, INTERMEDIATE_FOLDER, OUTPUT_FOLDER]:
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"\n❌ Please create folder '{os.path.basename(path)}' at:\n{path}\n")
-os.makedirs(INTERMEDIATE_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+
+def setup_logging(log_folder):
+    """Send log records to master_log.txt in `log_folder` through a queue and a background writer.
+
+    Logging calls only put the record on LOG_QUEUE; a listener thread strips emojis and does the
+    file writes. Worker processes log into the same queue (see setup_worker_logging).
+    """
+    global LOG_QUEUE, LOG_LISTENER
+    if LOG_LISTENER is not None:
+        return
+    import atexit
+    import multiprocessing
+
+    master_log_path = os.path.join(log_folder, "master_log.txt")
+    formatter = logging.Formatter('[%(asctime)s] %(levelname)s - %(message)s')
+
+    # File handler - this will log to a file, strip emojis and roll over into gzipped archives
+    file_handler = logging.handlers.RotatingFileHandler(master_log_path, mode='a', maxBytes=LOG_MAX_BYTES,
+                                                        backupCount=LOG_BACKUPS, encoding='utf-8', delay=True)
+    file_handler.namer = lambda name: name + ".gz"
+    file_handler.rotator = compress_log
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(formatter)
+    file_handler.addFilter(EmojiFilter())
+
+    LOG_QUEUE = multiprocessing.Queue(-1)
+    LOG_LISTENER = logging.handlers.QueueListener(LOG_QUEUE, file_handler, respect_handler_level=True)
+    LOG_LISTENER.start()
+    atexit.register(stop_logging)  # flushes whatever is still queued on exit
+
+    setup_worker_logging(LOG_QUEUE)
+
+
+def stop_logging():
+    """Write out any queued records and stop the background log writer."""
+    global LOG_LISTENER
+    if LOG_LISTENER is not None:
+        LOG_LISTENER.stop()
+        LOG_LISTENER = None
+
+
+def setup_worker_logging(log_queue):
+    """Point this process's logging at the shared queue."""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+
+def setup_worker(log_queue, reader_choice):
+    """Worker pool initializer: log into the shared queue and rank reader engines like the parent."""
+    setup_worker_logging(log_queue)
+    READER_CHOICE.update(reader_choice)
+
+
+def configure(onedrive_root=None, workers=None, scratch_root=None, data_root=None):
+    """Resolve the tool's folders under OneDrive, check they exist and start logging.
+
+    `onedrive_root` defaults to the OneDrive environment variable, `workers` to MAX_WORKERS,
+    `scratch_root` to EXCEL_AUTOMATION_SCRATCH or an "Excel Automation Tool" folder in the system temp
+    and `data_root` to EXCEL_AUTOMATION_DATA or an "Excel Automation Tool" folder in the local app data.
+    """
+    global PRE_UPDATED, INTERMEDIATE_FOLDER, OUTPUT_FOLDER, LOG_FOLDER, LEDGER_PATH, METRICS_PATH, MAX_WORKERS
+    global SCRATCH_ROOT, PARSE_CACHE_FOLDER, DATA_ROOT, HISTORY_PATH, READER_CHOICE_PATH
+
+    # Get OneDrive root path
+    onedrive_root = onedrive_root or os.environ.get("OneDrive")
+    if not onedrive_root:
+        raise EnvironmentError("❌ OneDrive path not found. Please ensure OneDrive is set up on this user account.")
+    tool_folder = os.path.join(onedrive_root, "Excel Automation Tool")
+
+    # Log folder path using OneDrive
+    LOG_FOLDER = os.path.join(tool_folder, "Logs")
+    os.makedirs(LOG_FOLDER, exist_ok=True)
+    setup_logging(LOG_FOLDER)
+
+    # Defined folder paths for folders
+    PRE_UPDATED = os.path.join(tool_folder, "Pre-Updated")
+    INTERMEDIATE_FOLDER = os.path.join(tool_folder, "Intermediate Folder")
+    OUTPUT_FOLDER = os.path.join(tool_folder, "Output")
+
+    # Check that required folders exist
+    for path in [PRE_UPDATED, INTERMEDIATE_FOLDER, OUTPUT_FOLDER]:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"\n❌ Please create folder '{os.path.basename(path)}' at:\n{path}\n")
+
+    LEDGER_PATH = os.path.join(tool_folder, "processed_ledger.json")
+    # Per-file, per-stage timings for every run are appended here, one JSON line per run
+    METRICS_PATH = os.path.join(LOG_FOLDER, "run_metrics.jsonl")
+    if workers:
+        MAX_WORKERS = workers
+
+    # Kept off OneDrive so the sync client only ever sees finished files
+    SCRATCH_ROOT = (scratch_root or os.environ.get("EXCEL_AUTOMATION_SCRATCH")
+                    or os.path.join(tempfile.gettempdir(), "Excel Automation Tool"))
+    PARSE_CACHE_FOLDER = os.path.join(SCRATCH_ROOT, "Parsed Cache")
+    os.makedirs(PARSE_CACHE_FOLDER, exist_ok=True)
+
+    # The history database lives on local disk too: SQLite's locks and journal files don't survive a
+    # sync client, which can copy the file mid-write or leave conflicted copies. Unlike the scratch
+    # folder it is kept for good, so it goes in the local app data rather than temp
+    DATA_ROOT = (data_root or os.environ.get("EXCEL_AUTOMATION_DATA")
+                 or os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser(os.path.join("~", ".local", "share")),
+                                 "Excel Automation Tool"))
+    os.makedirs(DATA_ROOT, exist_ok=True)
+    HISTORY_PATH = os.path.join(DATA_ROOT, "meter_history.sqlite")
+    # Earlier versions kept it in the OneDrive tool folder; move it (with any journal) on first use
+    old_history = os.path.join(tool_folder, "meter_history.sqlite")
+    if os.path.exists(old_history) and not os.path.exists(HISTORY_PATH):
+        for suffix in ("", "-journal", "-wal", "-shm"):
+            if os.path.exists(old_history + suffix):
+                shutil.move(old_history + suffix, HISTORY_PATH + suffix)
+
+    # Reader engines are ranked per machine by --pick-reader; without a ranking the default order is used.
+    # It is kept with the history (temp can be cleared at any time); earlier versions kept it in scratch
+    READER_CHOICE_PATH = os.path.join(DATA_ROOT, "reader_engines.json")
+    old_choice = os.path.join(SCRATCH_ROOT, "reader_engines.json")
+    if os.path.exists(old_choice) and not os.path.exists(READER_CHOICE_PATH):
+        shutil.move(old_choice, READER_CHOICE_PATH)
+    try:
+        with open(READER_CHOICE_PATH, encoding="utf-8") as f:
+            READER_CHOICE.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Clean the exports in Pre-Updated and build the Final master workbook.")
+    parser.add_argument("--onedrive", metavar="PATH", help="OneDrive folder to use instead of the OneDrive environment variable")
+    parser.add_argument("--workers", type=int, help="worker processes for the per-file loop (default: one per CPU)")
+    parser.add_argument("--scratch", metavar="PATH", help="local folder for work in progress (default: the system temp folder)")
+    parser.add_argument("--data", metavar="PATH",
+                        help="local folder for the meter history database (default: the local app data folder)")
+    parser.add_argument("--abnormal-change", type=float, metavar="FRACTION",
+                        help="flag usage this far above or below the same month in earlier years (default: 0.5 = 50%%)")
+    parser.add_argument("--history", metavar="METER",
+                        help="print a meter's usage over the last 24 months and exit (its ID, e.g. 06.06ME1, or full name)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and process exports as they arrive in Pre-Updated")
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE, metavar="SECONDS",
+                        help="with --watch, how long a file must stay unchanged before it is processed (default: %(default)s)")
+    parser.add_argument("--pick-reader", action="store_true",
+                        help="time the installed spreadsheet readers on the exports in Pre-Updated, keep the fastest and exit")
+    parser.add_argument("--no-pause", action="store_true", help="exit when done instead of waiting for Enter")
+    return parser.parse_args(argv)
+
+
+class StageTimer:
+    """Wall time spent in each processing stage of one file, plus a few size counts."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.counts = {}
+        self.started = self.last = time.perf_counter()
+
+    def mark(self, stage):
+        """Charge the time since the previous mark to `stage`."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last
+        self.last = now
+
+    def record(self):
+        return {
+            "file": self.name,
+            "seconds": round(self.last - self.started, 4),
+            "stages": {stage: round(seconds, 4) for stage, seconds in self.stages.items()},
+            **self.counts,
+        }
+
+
+# Validation status recorded with each usage value, by the fill its usage cell gets
+USAGE_STATUS = {"C6EFCE": "complete", "FFC7CE": "incomplete month", "FFFF00": "gaps"}
+
+
+class MasterData:
+    """Usage rows for the Final workbook, stored column by column.
+
+    Building, meter, source file, bill month, validation status and billing period ("YYYY-MM" of the
+    first reading, "" if no timestamp parsed) are kept as int32 codes into
+    per-column category lists, usage as float64 and the expected/actual interval counts as int32,
+    in compact stdlib arrays. Results from worker processes are merged with extend() by remapping
+    codes, and to_frame() turns the buffers into categorical and numeric pandas columns with one
+    bulk copy each, so rows can still be appended while a frame is in use.
+    """
+
+    TEXT_COLUMNS = ("building", "meter", "source_file", "bill_month", "status", "period")
+
+    def __init__(self):
+        self.categories = {name: [] for name in self.TEXT_COLUMNS}
+        self.codes = {name: array("i") for name in self.TEXT_COLUMNS}
+        self.usage = array("d")
+        self.expected = array("i")  # intervals the meter should have a reading for (0 = not checked)
+        self.actual = array("i")  # intervals it does have a reading for
+        self._lookup = {name: {} for name in self.TEXT_COLUMNS}
+
+    def __len__(self):
+        return len(self.usage)
+
+    def __iter__(self):
+        # (building, meter, usage) per row, in the order they were added
+        buildings, meters = self.categories["building"], self.categories["meter"]
+        for b, m, usage in zip(self.codes["building"], self.codes["meter"], self.usage):
+            yield buildings[b], meters[m], usage
+
+    def _code(self, name, value):
+        lookup = self._lookup[name]
+        if value not in lookup:
+            lookup[value] = len(self.categories[name])
+            self.categories[name].append(value)
+        return lookup[value]
+
+    def append(self, building, meter, usage, source_file="", bill_month="", status="", expected=0, actual=0,
+               period=""):
+        for name, value in zip(self.TEXT_COLUMNS, (building, meter, source_file, bill_month, status, period)):
+            self.codes[name].append(self._code(name, value))
+        self.usage.append(usage)
+        self.expected.append(expected)
+        self.actual.append(actual)
+
+    def extend(self, other):
+        """Append every row of another MasterData, e.g. one sent back by a worker process."""
+        import numpy as np
+
+        for name in self.TEXT_COLUMNS:
+            remap = np.array([self._code(name, value) for value in other.categories[name]] or [0], dtype=np.int32)
+            self.codes[name].frombytes(remap[np.frombuffer(other.codes[name], dtype=np.int32)].tobytes())
+        self.usage.extend(other.usage)
+        self.expected.extend(other.expected)
+        self.actual.extend(other.actual)
+
+    def __getstate__(self):
+        # The lookup dicts are rebuilt on arrival, so they don't travel between processes
+        return {"categories": self.categories, "codes": self.codes, "usage": self.usage,
+                "expected": self.expected, "actual": self.actual}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lookup = {name: {value: code for code, value in enumerate(values)}
+                        for name, values in self.categories.items()}
+
+    def to_frame(self):
+        """DataFrame of all rows: categorical text columns, float64 usage and int32 interval counts.
+
+        The frame gets its own copy of every column. Sharing the array buffers would stop this
+        MasterData from growing (BufferError on append) for as long as the frame is alive.
+        """
+        import numpy as np
+        import pandas as pd
+
+        columns = {
+            name: pd.Categorical.from_codes(np.frombuffer(self.codes[name], dtype=np.int32).copy(),
+                                            categories=pd.Index(self.categories[name], dtype=object), validate=False)
+            for name in self.TEXT_COLUMNS
+        }
+        columns["usage"] = np.frombuffer(self.usage, dtype=np.float64).copy()
+        columns["expected"] = np.frombuffer(self.expected, dtype=np.int32).copy()
+        columns["actual"] = np.frombuffer(self.actual, dtype=np.int32).copy()
+        return pd.DataFrame(columns, copy=False)[["building", "meter", "usage", "source_file", "bill_month", "status",
+                                                  "expected", "actual", "period"]]
+
+    def to_records(self):
+        """Rows as plain lists, for the JSON ledger."""
+        # Same order as append()'s arguments, so from_records can pass them straight back
+        names = [(self.codes[name], self.categories[name]) for name in self.TEXT_COLUMNS]
+        return [[values[codes[i]] for codes, values in names[:2]] + [self.usage[i]]
+                + [values[codes[i]] for codes, values in names[2:5]] + [self.expected[i], self.actual[i]]
+                + [values[codes[i]] for codes, values in names[5:]]
+                for i in range(len(self))]
+
+    @classmethod
+    def from_records(cls, records):
+        data = cls()
+        for building, meter, usage, *details in records:
+            data.append(building, meter, usage, *details)
+        return data
 
 
 def extract_clean_meter_name(raw_name):
@@ -92,23 +400,1035 @@ def round_to_nearest_power_of_10(val, is_cogen):
     return math.floor(val / power) * power if is_cogen else math.ceil(val / power) * power
 
 
-def handle_nitrogen_file(input_path, intermediate_subfolder, building, today_str, bill_month, time_str, master_data):
+def leading_power_of_10(values):
+    import numpy as np
+
+    # Power of ten of each value's leading digit (1 for anything below 10), element-wise
+    magnitude = np.floor(np.abs(np.asarray(values, dtype=float)))
+    digits = np.floor(np.log10(np.maximum(magnitude, 1))) + 1
+    # log10 can land a hair off at exact powers of ten; nudge the digit count back into place
+    digits = np.where(10.0 ** (digits - 1) > np.maximum(magnitude, 1), digits - 1, digits)
+    digits = np.where(10.0 ** digits <= magnitude, digits + 1, digits)
+    return 10.0 ** (digits - 1)
+
+
+def round_to_nearest_power_of_10_array(values, is_cogen):
+    import numpy as np
+
+    # Same rounding as round_to_nearest_power_of_10, applied element-wise to a NumPy array
+    values = np.asarray(values, dtype=float)
+    power = leading_power_of_10(values)
+    return np.floor(values / power) * power if is_cogen else np.ceil(values / power) * power
+
+
+# A reading below a tenth of the one before it is a register event. It is a rollover when the
+# register was at least ROLLOVER_FULL of the way to its size (99,990 of 100,000), otherwise a reset
+# back to zero (meter replaced or cleared).
+ROLLOVER_FULL = 0.9
+
+# One detected register event: meter column, data row of the first reading after it, "rollover"
+# or "reset", and the readings either side
+RegisterEvent = namedtuple("RegisterEvent", ["column", "row", "kind", "before", "after"])
+
+
+def compute_meter_usage(readings, is_cogen):
+    """Compute usage for every meter column of an interval matrix in one vectorized pass.
+
+    `readings` is a 2-D float array (rows = intervals, columns = meters) holding NaN wherever a
+    cell has no numeric reading. Usage is the last reading minus the first, plus what each register
+    event hid: the rounded register size for a rollover, the reading it dropped from for a reset.
+    Cogen meters only count their events when the last reading is above the first.
+
+    Returns a dict of per-meter arrays: `valid` (at least two readings), `first_idx`/`last_idx`
+    (row positions of the first and last reading), `first`, `last`, `flip_value` (the reading just
+    before the first event, NaN if none), `rollovers`, `resets` and `usage`, plus `events`, a list
+    of RegisterEvent in column then row order.
+    """
+    import numpy as np
+    import pandas as pd
+
+    readings = np.asarray(readings, dtype=float)
+    n_rows, n_cols = readings.shape
+    present = ~np.isnan(readings)
+    valid = present.sum(axis=0) >= 2
+    cols = np.arange(n_cols)
+
+    if n_rows == 0:
+        empty = np.full(n_cols, np.nan)
+        none = np.zeros(n_cols, dtype=int)
+        return {"valid": valid, "first_idx": none, "last_idx": none, "first": empty, "last": empty,
+                "flip_value": empty, "rollovers": none, "resets": none, "usage": empty, "events": []}
+
+    first_idx = present.argmax(axis=0)
+    last_idx = n_rows - 1 - present[::-1].argmax(axis=0)
+    first = readings[first_idx, cols]
+    last = readings[last_idx, cols]
+
+    # Previous numeric reading for every row: forward-fill down the column, then shift by one row
+    prev = pd.DataFrame(readings).ffill().shift(1).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drops = present & (prev != 0) & (np.abs(readings / prev) < 0.1)
+
+    # Work column-major so each column's drops split it into consecutive segments. A drop is only a
+    # bad reading when, before the next drop, a single step jumps from below a tenth of the reading
+    # it dropped from straight back up to at least that reading
+    flat_drops = drops.T.ravel()
+    drop_pos = np.flatnonzero(flat_drops)  # column-major positions, so already in column, row order
+    drop_col, drop_row = np.divmod(drop_pos, n_rows)
+    before = prev[drop_row, drop_col]
+    after = readings[drop_row, drop_col]
+
+    recovered = np.zeros(len(drop_pos), dtype=bool)
+    if len(drop_pos):
+        starts = flat_drops.copy()
+        starts[::n_rows] = True
+        segment = np.cumsum(starts) - 1
+        level = np.full(segment[-1] + 1, np.inf)  # reading each segment's drop came from
+        level[segment[drop_pos]] = np.abs(before)
+        flat_level = level[segment]
+        with np.errstate(invalid="ignore"):
+            jumps_back = (np.abs(readings.T.ravel()) >= flat_level) & (np.abs(prev.T.ravel()) < 0.1 * flat_level)
+        recovered = np.bincount(segment, weights=jumps_back, minlength=len(level))[segment[drop_pos]] > 0
+
+    event_col, event_row = drop_col[~recovered], drop_row[~recovered]
+    before, after = before[~recovered], after[~recovered]
+    rollover = np.abs(before) >= ROLLOVER_FULL * 10 * leading_power_of_10(before)
+    if is_cogen:
+        # Cogen registers only count a wrap when they end the period above where they started
+        counted = last[event_col] > first[event_col]
+        event_col, event_row, before, after, rollover = (
+            event_col[counted], event_row[counted], before[counted], after[counted], rollover[counted])
+
+    hidden = np.where(rollover, round_to_nearest_power_of_10_array(before, is_cogen), before)
+    usage = last - first + np.bincount(event_col, weights=hidden, minlength=n_cols)
+    rollovers = np.bincount(event_col, weights=rollover, minlength=n_cols).astype(int)
+    resets = np.bincount(event_col, weights=~rollover, minlength=n_cols).astype(int)
+    flip_value = np.full(n_cols, np.nan)
+    first_event = np.unique(event_col, return_index=True)
+    flip_value[first_event[0]] = before[first_event[1]]
+
+    events = [RegisterEvent(int(k), int(r), "rollover" if is_rollover else "reset", b, a)
+              for k, r, is_rollover, b, a in zip(event_col.tolist(), event_row.tolist(), rollover.tolist(),
+                                                 before.tolist(), after.tolist())]
+    return {"valid": valid, "first_idx": first_idx, "last_idx": last_idx, "first": first, "last": last,
+            "flip_value": flip_value, "rollovers": rollovers, "resets": resets, "usage": usage, "events": events}
+
+
+# Formats our meter exports use for timestamp text; the first one that fits a sample of the column wins
+TIMESTAMP_FORMATS = [
+    "%m/%d/%Y %I:%M %p",
+    "%m/%d/%Y %I:%M:%S %p",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y/%m/%d %H:%M",
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%b %d, %Y %I:%M %p",
+    "%d-%b-%Y %H:%M",
+]
+TIMESTAMP_SAMPLE_SIZE = 20
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp_text(text, fuzzy=False):
+    from dateutil.parser import parse
+
+    # dateutil fallback for text no known format matched; cached because exports repeat values a lot
+    try:
+        return parse(text, fuzzy=fuzzy).replace(tzinfo=None)
+    except Exception:
+        return None
+
+
+def infer_timestamp_format(texts):
+    sample = [t for t in texts if t.strip()][:TIMESTAMP_SAMPLE_SIZE]
+    for fmt in TIMESTAMP_FORMATS:
+        try:
+            for text in sample:
+                datetime.strptime(text, fmt)
+            return fmt if sample else None
+        except ValueError:
+            continue
+    return None
+
+
+def parse_timestamps(values):
+    """Parse a column of export timestamps into a DatetimeIndex (NaT where a value is not a date).
+
+    The text format is inferred once per column and every distinct string is converted in a
+    single vectorized pass; anything that doesn't fit the format falls back to dateutil.
+    """
+    import pandas as pd
+
+    parsed = [pd.NaT] * len(values)
+    positions = {}
+    for i, val in enumerate(values):
+        if isinstance(val, datetime):
+            parsed[i] = val
+        elif val is not None:
+            positions.setdefault(str(val), []).append(i)
+
+    texts = list(positions)
+    fmt = infer_timestamp_format(texts)
+    if fmt:
+        converted = pd.to_datetime(pd.Series(texts, dtype=object), format=fmt, errors="coerce")
+    else:
+        converted = pd.Series(pd.NaT, index=range(len(texts)))
+
+    for text, ts in zip(texts, converted):
+        if pd.isna(ts):
+            ts = parse_timestamp_text(text)
+        if ts is not None:
+            for i in positions[text]:
+                parsed[i] = ts
+    return pd.DatetimeIndex(pd.to_datetime(parsed, errors="coerce"))
+
+
+def month_boundary_flags(first_times, last_times):
+    import numpy as np
+    import pandas as pd
+
+    # True where readings run from 12:15 AM on the 1st through 12:00 AM on the 1st of the next month
+    first = pd.DatetimeIndex(first_times)
+    last = pd.DatetimeIndex(last_times)
+    next_month = np.where(first.month == 12, 1, first.month + 1)
+    next_year = np.where(first.month == 12, first.year + 1, first.year)
+    return np.asarray(
+        (first.day == 1) & (first.hour == 0) & (first.minute == 15) &
+        (last.day == 1) & (last.month == next_month) & (last.year == next_year) &
+        (last.hour == 0) & (last.minute == 0),
+        dtype=bool,
+    )
+
+
+# One run of intervals a meter has no reading for: meter column, first and last missing interval
+# (timestamps) and how many intervals that is
+IntervalGap = namedtuple("IntervalGap", ["column", "start", "end", "missing"])
+
+EXPORT_TIMEZONE = "America/Toronto"  # local time the exports are stamped in, for daylight saving time
+
+
+def dst_skipped_slots(start, interval, count):
+    """Mask of the `count` interval slots from `start` (both in ns) that the clocks skip when DST starts."""
+    import numpy as np
     import pandas as pd
+    from dateutil import tz
+
+    zone = tz.gettz(EXPORT_TIMEZONE)
+    if zone is None:
+        return np.zeros(count, dtype=bool)
+    times = pd.DatetimeIndex((start + np.arange(count, dtype=np.int64) * interval).astype("datetime64[ns]"))
+    # Only wall-clock times that don't exist come back NaT; repeated ones in the autumn are kept
+    localized = times.tz_localize(zone, ambiguous=np.ones(count, dtype=bool), nonexistent="NaT")
+    return np.asarray(localized.isna())
+
+
+def interval_completeness(parsed_times, missing):
+    """Index every run of missing intervals per meter, from timestamp deltas and the null mask.
+
+    `parsed_times` holds one timestamp per data row (NaT where it didn't parse) and `missing` is the
+    rows x meters mask of cells with no reading. The export's interval is its most common timestamp
+    step, and every meter is expected to have a reading for each interval from the first timestamp
+    to the last; rows missing from the export and blank cells both count as gaps. The wall-clock
+    hour skipped when daylight saving time starts in EXPORT_TIMEZONE is not expected, unless the
+    export has rows in it (one stamped in standard time all year). Returns a dict with the
+    `interval` (a Timedelta, None without two timestamps), per-meter `expected`, `actual` and
+    `interior` (missing intervals between the meter's first and last reading) counts and `gaps`,
+    a list of IntervalGap in column then time order.
+    """
+    import numpy as np
+    import pandas as pd
+
+    n_rows, n_cols = missing.shape
+    times = pd.DatetimeIndex(parsed_times).as_unit("ns")
+    timed = ~np.asarray(times.isna())
+    ns = times.asi8
+    steps = np.diff(np.sort(ns[timed]))
+    steps = steps[steps > 0]
+    none = np.zeros(n_cols, dtype=int)
+    if not len(steps):
+        return {"interval": None, "expected": none, "actual": none, "interior": none, "gaps": []}
+
+    values, counts = np.unique(steps, return_counts=True)
+    interval = int(values[counts.argmax()])
+    start = int(ns[timed].min())
+    # Interval slot of every row, counted from the first timestamp
+    slots = np.rint((ns - start) / interval).astype(np.int64)
+    expected = int(slots[timed].max()) + 1
+    skipped = dst_skipped_slots(start, interval, expected)
+    # A skipped hour with any row in it means the export doesn't follow DST, so all of it is expected
+    skipped_run = np.cumsum(np.r_[skipped[:1], skipped[1:] & ~skipped[:-1]])
+    skipped &= ~np.isin(skipped_run, skipped_run[slots[timed]][skipped[slots[timed]]])
+    # Skipped slots before each slot, so the ones inside any run of slots can be taken off its count
+    skipped_before = np.r_[0, np.cumsum(skipped)]
+
+    # Readings in column-major order, so each column's slots come out in a row and consecutive
+    # entries of the same column are neighbouring readings
+    present = (~missing & timed[:, None]).T
+    pos = np.flatnonzero(present.ravel())
+    col = pos // n_rows
+    slot = slots[pos % n_rows]
+    same = col[1:] == col[:-1]
+    step = np.diff(slot)
+    inner = same & (step > 1)
+
+    # Gaps before a meter's first reading, between readings and after its last, as (column, first
+    # missing slot, last missing slot)
+    firsts = np.flatnonzero(np.r_[True, ~same]) if len(pos) else np.array([], dtype=int)
+    lasts = np.flatnonzero(np.r_[~same, True]) if len(pos) else np.array([], dtype=int)
+    empty_cols = np.setdiff1d(np.arange(n_cols), col)
+    lead = slot[firsts] > 0
+    trail = slot[lasts] < expected - 1
+    gap_col = np.concatenate([col[firsts][lead], col[:-1][inner], col[lasts][trail], empty_cols])
+    gap_from = np.concatenate([np.zeros(lead.sum(), dtype=np.int64), slot[:-1][inner] + 1, slot[lasts][trail] + 1,
+                               np.zeros(len(empty_cols), dtype=np.int64)])
+    gap_to = np.concatenate([slot[firsts][lead] - 1, slot[1:][inner] - 1, np.full(trail.sum(), expected - 1),
+                             np.full(len(empty_cols), expected - 1)])
+    order = np.lexsort((gap_from, gap_col))
+    gap_col, gap_from, gap_to = gap_col[order], gap_from[order], gap_to[order]
+    gap_missing = gap_to - gap_from + 1 - (skipped_before[gap_to + 1] - skipped_before[gap_from])
+    # Gaps that are only the skipped DST hour go; the others start and end on slots that exist
+    keep = gap_missing > 0
+    gap_col, gap_from, gap_to, gap_missing = gap_col[keep], gap_from[keep], gap_to[keep], gap_missing[keep]
+    real = np.flatnonzero(~skipped)
+    gap_from = real[np.searchsorted(real, gap_from)]
+    gap_to = real[np.searchsorted(real, gap_to, side="right") - 1]
+
+    total_missing = np.bincount(gap_col, weights=gap_missing, minlength=n_cols).astype(int)
+    inner_missing = step[inner] - 1 - (skipped_before[slot[1:][inner]] - skipped_before[slot[:-1][inner] + 1])
+    interior = np.bincount(col[:-1][inner], weights=inner_missing, minlength=n_cols).astype(int)
+    # Slots back to plain datetimes for the workbook
+    gap_start = (start + gap_from * interval).astype("datetime64[ns]").astype("datetime64[us]").tolist()
+    gap_end = (start + gap_to * interval).astype("datetime64[ns]").astype("datetime64[us]").tolist()
+    gaps = list(map(IntervalGap, gap_col.tolist(), gap_start, gap_end, gap_missing.tolist()))
+    expected -= int(skipped.sum())
+    return {"interval": pd.Timedelta(interval), "expected": np.full(n_cols, expected),
+            "actual": expected - total_missing, "interior": interior, "gaps": gaps}
+
+
+def first_timestamp(values, parsed):
+    import pandas as pd
+
+    # First value that reads as a date, trying a fuzzy parse on anything the fast path skipped; None if none does
+    for val, ts in zip(values, parsed):
+        if pd.isna(ts):
+            ts = parse_timestamp_text(str(val), fuzzy=True)
+        if ts is not None and not pd.isna(ts):
+            return ts
+    return None
+
+
+def format_meter_header(value):
+    # Split a raw meter header into "number / description / (unit)" lines
+    original = str(value).strip()
+    lines = []
+
+    # Extract leading part (e.g., "06.06ME1")
+    match = re.match(r"^([\d.]+[A-Z]*\d*)", original)
+    if match:
+        number_part = match.group(1)
+        lines.append(number_part)
+        rest = original[len(number_part):].strip()
+    else:
+        rest = original
+
+    # Extract unit like (kWh)
+    unit = ""
+    if "(" in rest and ")" in rest:
+        rest_parts = rest.split("(", 1)
+        rest = rest_parts[0].strip()
+        unit = f"({rest_parts[1].strip(')')})"
+
+    if rest:
+        lines.append(rest)
+    if unit:
+        lines.append(unit)
+
+    return "\n".join(lines)
+
+
+def frame_to_rows(df):
+    # Plain Python values (None for blanks) so openpyxl and isinstance checks see int/float, not numpy types
+    return df.astype(object).where(df.notna(), None).values.tolist()
+
+
+HEADER_SEARCH_ROWS = 30  # the "timestamp" header must appear within this many rows
+
+# Cell text pandas.read_excel treats as missing by default; the streaming loader does the same
+MISSING_TEXT = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+}
+# Excel's error values, which openpyxl hands back as plain text
+ERROR_TEXT = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"}
+
+# A parsed export: the raw rows down to and including the "timestamp" header row, then the
+# interval block below it as column-A values, a float64 matrix of meter readings (NaN where a
+# cell holds no number) and any other non-empty meter cells keyed by (data row, meter column)
+ExportData = namedtuple("ExportData", ["head_rows", "timestamps", "readings", "text_cells"])
+
+
+def plain_number(value):
+    # Whole-number readings come back from Excel as ints; keep them that way when writing out
+    return int(value) if value.is_integer() and abs(value) < 1e16 else value
+
+
+def is_blank(value):
+    return value is None or str(value).strip() == ""
+
+
+def clean_cell(value):
+    # Excel error values and the usual "missing" strings come through as blanks
+    if isinstance(value, str) and (value in MISSING_TEXT or value in ERROR_TEXT):
+        return None
+    return value
+
+
+# A way of reading a spreadsheet's first sheet as rows of cell values: the file types it handles,
+# the module it needs installed and the function that yields the rows
+# `streams` engines never hold the whole sheet in memory; the others load it in one go
+ReaderEngine = namedtuple("ReaderEngine", ["extensions", "module", "read_rows", "streams"])
+READER_ENGINES = {}  # name -> ReaderEngine; without a saved ranking they are tried in this order
+# Spreadsheets bigger than this go to a streaming engine first, whatever the ranking, to keep memory bounded
+STREAMING_READ_BYTES = 16 * 1024 * 1024
+
+
+def reader_engine(name, extensions, module, streams=False):
+    """Register the decorated row reader as engine `name`."""
+    def register(read_rows):
+        READER_ENGINES[name] = ReaderEngine(extensions, module, read_rows, streams)
+        return read_rows
+    return register
+
+
+def calamine_value(value):
+    # calamine hands back every number as a float and midnight timestamps as dates; match openpyxl
+    if isinstance(value, float):
+        return plain_number(value)
+    if type(value) is date:
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+@reader_engine("calamine", (".xlsx", ".xlsm", ".xlsb", ".xls", ".ods"), "python_calamine")
+def calamine_rows(input_path):
+    # Rust-backed reader: the sheet is decoded into calamine's own compact cell range, and each row
+    # only becomes Python values as it is consumed. iter_rows starts at the top row but at the first
+    # used column, so the empty columns left of that are put back. Empty cells come back as "",
+    # which clean_cell turns back into blanks
+    from python_calamine import CalamineWorkbook
+
+    wb = CalamineWorkbook.from_path(input_path)
+    try:
+        sheet = wb.get_sheet_by_index(0)
+        lead = [""] * (sheet.start[1] if sheet.start else 0)
+        for row in sheet.iter_rows():
+            yield lead + [calamine_value(v) for v in row]
+    finally:
+        wb.close()
+
+
+@reader_engine("openpyxl", (".xlsx", ".xlsm"), "openpyxl", streams=True)
+def openpyxl_rows(input_path):
+    # Streams row by row through read-only mode, so the sheet is never held in memory whole
     from openpyxl import load_workbook
-    from openpyxl.styles import Alignment, PatternFill, Font
+
+    wb = load_workbook(input_path, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+@reader_engine("pandas", (".xlsx", ".xlsm", ".xlsb", ".xls", ".ods"), "pandas")
+def pandas_rows(input_path):
+    # pandas picks its own engine for the file type (xlrd for .xls, pyxlsb for .xlsb, ...)
+    import pandas as pd
+
+    return frame_to_rows(pd.read_excel(input_path, header=None))
+
+
+@lru_cache(maxsize=None)
+def module_installed(module):
+    import importlib.util
+
+    return importlib.util.find_spec(module) is not None
+
+
+def reader_order(extension, size=0):
+    """Installed engines that handle `extension`, in the order read_export tries them for a `size`-byte file."""
+    ranking = READER_CHOICE.get(extension, [])
+    names = [name for name in ranking if name in READER_ENGINES]
+    names += [name for name in READER_ENGINES if name not in names]
+    if size > STREAMING_READ_BYTES:
+        names.sort(key=lambda name: not READER_ENGINES[name].streams)
+    return [name for name in names
+            if extension in READER_ENGINES[name].extensions and module_installed(READER_ENGINES[name].module)]
+
+
+def read_export(input_path, cache_path=None):
+    """Load an export into an ExportData without materializing the whole sheet.
+
+    CSV/TSV files go through read_delimited_export; spreadsheets are read by the first engine from
+    reader_order that succeeds (a streaming one first for spreadsheets over STREAMING_READ_BYTES).
+    Returns None when no "timestamp" header is found near the top.
+    With a `cache_path` the parsed export is loaded from there when present, or saved there.
+    """
+    if cache_path:
+        export = load_parsed_export(cache_path)
+        if export is None:
+            export = read_export(input_path)
+            if export is not None:
+                save_parsed_export(cache_path, export)
+        return export
+
+    extension = os.path.splitext(input_path)[1].lower()
+    if extension in DELIMITED_EXTENSIONS:
+        return read_delimited_export(input_path)
+    engines = reader_order(extension, os.path.getsize(input_path))
+    if not engines:
+        raise ValueError(f"No installed spreadsheet reader handles {extension} files")
+    for n, name in enumerate(engines):
+        try:
+            return collect_export(READER_ENGINES[name].read_rows(input_path))
+        except Exception as e:
+            if n == len(engines) - 1:
+                raise
+            logging.warning(f"{name} could not read {os.path.basename(input_path)} ({e}) - trying {engines[n + 1]}")
+
+
+# CSV/TSV exports skip the spreadsheet readers and are parsed straight into an ExportData
+DELIMITED_EXTENSIONS = (".csv", ".tsv")
+EXPORT_EXTENSIONS = (".xls", ".xlsx") + DELIMITED_EXTENSIONS  # files picked up from Pre-Updated
+CSV_CHUNK_ROWS = 20000  # data rows converted to numbers per block
+
+
+def csv_value(text):
+    # Text that reads as a number becomes one, the way Excel opens a CSV
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return plain_number(number) if math.isfinite(number) else text
+
+
+def csv_number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+
+def read_delimited_export(input_path):
+    """Load a CSV or TSV export into an ExportData, streaming the data block in chunks.
+
+    Rows are read once through the csv module; each chunk of CSV_CHUNK_ROWS data rows is converted
+    to numbers a whole column at a time, and cells that are not numbers are kept as text just like
+    collect_export does. Returns None when no "timestamp" header is found near the top.
+    """
+    import csv
+    import numpy as np
+    from itertools import islice
+
+    with open(input_path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        if input_path.lower().endswith(".tsv"):
+            delimiter = "\t"
+        else:
+            try:
+                delimiter = csv.Sniffer().sniff(f.read(64 * 1024), delimiters=",;\t").delimiter
+            except csv.Error:
+                delimiter = ","
+            f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+
+        head_rows = []
+        for row in reader:
+            head_rows.append([clean_cell(csv_value(v)) for v in row])
+            if any(v and "timestamp" in str(v).lower() for v in row):
+                break
+            if len(head_rows) >= HEADER_SEARCH_ROWS:
+                return None
+        else:
+            return None
+
+        timestamps = []
+        blocks = []
+        text_cells = {}
+        width = max((len(row) for row in head_rows), default=1)
+        last_filled = -1
+        while True:
+            chunk = list(islice(reader, CSV_CHUNK_ROWS))
+            if not chunk:
+                break
+            start = len(timestamps)
+            # A chunk of nothing but blank lines still has its (empty) timestamp column
+            chunk_width = max(1, max(len(row) for row in chunk))
+            cells = np.array([row + [""] * (chunk_width - len(row)) for row in chunk], dtype=object)
+
+            timestamps += [clean_cell(csv_value(v)) for v in cells[:, 0]]
+            values = np.full((len(chunk), max(chunk_width - 1, 0)), np.nan)
+            filled = np.array([v is not None for v in timestamps[start:]])
+            for k in range(values.shape[1]):
+                column = cells[:, k + 1]
+                try:
+                    numbers = np.where(column == "", "nan", column).astype(float)
+                except ValueError:
+                    numbers = np.array([csv_number(v) for v in column])
+                numbers[~np.isfinite(numbers)] = np.nan
+                values[:, k] = numbers
+                used = ~np.isnan(numbers)
+                for r in np.flatnonzero(~used).tolist():
+                    v = clean_cell(column[r])
+                    if v is not None:
+                        text_cells[(start + r, k)] = v
+                        used[r] = True
+                if used.any():
+                    width = max(width, k + 2)
+                    filled |= used
+            if filled.any():
+                last_filled = start + int(np.flatnonzero(filled)[-1])
+            blocks.append(values)
+
+    # Trailing empty rows carry nothing, same as collect_export drops them
+    timestamps = timestamps[:last_filled + 1]
+    readings = np.full((len(timestamps), width - 1), np.nan)
+    row = 0
+    for values in blocks:
+        rows = min(len(values), len(timestamps) - row)
+        if rows <= 0:
+            break
+        columns = min(values.shape[1], width - 1)
+        readings[row:row + rows, :columns] = values[:rows, :columns]
+        row += len(values)
+
+    head_rows = [row + [None] * (width - len(row)) for row in head_rows]
+    return ExportData(head_rows, timestamps, readings, text_cells)
+
+
+def time_reader_engines(paths, repeat=3):
+    """Seconds each installed engine takes to read `paths`, totalled per file type (best of `repeat`)."""
+    timings = {}
+    for path in paths:
+        extension = os.path.splitext(path)[1].lower()
+        for name, engine in READER_ENGINES.items():
+            if extension not in engine.extensions or not module_installed(engine.module):
+                continue
+            times = timings.setdefault(extension, {})
+            best = math.inf
+            try:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    collect_export(engine.read_rows(path))
+                    best = min(best, time.perf_counter() - started)
+            except Exception as e:
+                logging.warning(f"{name} could not read {os.path.basename(path)} while timing readers ({e})")
+            times[name] = times.get(name, 0.0) + best
+    return timings
+
+
+def pick_reader_engines(paths, repeat=3):
+    """Time the engines on `paths` and save a fastest-first ranking per file type for later runs.
+
+    Engines that failed on any file are left out of the ranking, so they are only tried after the
+    ranked ones. Returns the timings.
+    """
+    timings = time_reader_engines(paths, repeat)
+    for extension, times in timings.items():
+        READER_CHOICE[extension] = sorted((name for name in times if times[name] < math.inf), key=times.get)
+    with open(READER_CHOICE_PATH, "w", encoding="utf-8") as f:
+        json.dump(READER_CHOICE, f, indent=1)
+    return timings
+
+
+def collect_export(rows):
+    """Build an ExportData from an iterable of raw row value lists, consuming it once."""
+    import numpy as np
+
+    rows = iter(rows)
+    head_rows = []
+    for row in rows:
+        head_rows.append([clean_cell(v) for v in row])
+        if any(v and "timestamp" in str(v).lower() for v in row):
+            break
+        if len(head_rows) >= HEADER_SEARCH_ROWS:
+            return None
+    else:
+        return None
+
+    timestamps = []
+    reading_rows = []
+    text_cells = {}
+    width = max((len(row) for row in head_rows), default=1)
+    last_filled = -1
+
+    for r, row in enumerate(rows):
+        row = [clean_cell(v) for v in row]
+        while row and row[-1] is None:
+            row.pop()
+        if row:
+            last_filled = r
+            width = max(width, len(row))
+
+        timestamps.append(row[0] if row else None)
+        values = np.full(max(len(row) - 1, 0), np.nan)
+        for k, v in enumerate(row[1:]):
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                values[k] = v
+            elif v is not None:
+                text_cells[(r, k)] = v
+        reading_rows.append(values)
+
+    # Trailing empty rows carry nothing, same as pandas drops them
+    timestamps = timestamps[:last_filled + 1]
+    readings = np.full((len(timestamps), width - 1), np.nan)
+    for r, values in enumerate(reading_rows[:last_filled + 1]):
+        readings[r, :len(values)] = values
+
+    head_rows = [row + [None] * (width - len(row)) for row in head_rows]
+    return ExportData(head_rows, timestamps, readings, text_cells)
+
+
+def export_rows(export):
+    """The raw sheet rows an ExportData was built from, down to the last filled row."""
+    yield from export.head_rows
+    for r, timestamp in enumerate(export.timestamps):
+        row = [timestamp]
+        for k, v in enumerate(export.readings[r].tolist()):
+            row.append(plain_number(v) if v == v else export.text_cells.get((r, k)))
+        yield row
+
+
+# Column A values are stored in the parse cache as a type code plus one typed array per kind
+VALUE_KINDS = (type(None), str, datetime, float, int, bool)
+
+
+def encode_values(values):
+    """Split a list of cell values into typed NumPy arrays; TypeError for anything else."""
+    import numpy as np
+
+    kinds = np.zeros(len(values), dtype=np.int8)
+    text = [""] * len(values)
+    numbers = np.zeros(len(values))
+    times = np.full(len(values), np.datetime64("NaT"), dtype="datetime64[us]")
+    for i, v in enumerate(values):
+        if type(v) in VALUE_KINDS:
+            kind = VALUE_KINDS.index(type(v))
+        elif isinstance(v, datetime):
+            kind = 2  # pandas Timestamps from the .xls path
+        else:
+            raise TypeError(f"can't cache a {type(v).__name__} cell")
+        kinds[i] = kind
+        if kind == 1:
+            text[i] = v
+        elif kind == 2:
+            times[i] = np.datetime64(v.replace(tzinfo=None), "us")
+        elif kind > 2:
+            numbers[i] = v
+    return {"kinds": kinds, "text": np.array(text, dtype=str), "numbers": numbers, "times": times}
+
+
+def decode_values(kinds, text, numbers, times):
+    convert = [
+        lambda i: None,
+        lambda i: str(text[i]),
+        lambda i: times[i].astype(datetime),
+        lambda i: float(numbers[i]),
+        lambda i: int(numbers[i]),
+        lambda i: bool(numbers[i]),
+    ]
+    return [convert[kind](i) for i, kind in enumerate(kinds.tolist())]
+
+
+def encode_cell(value):
+    # JSON form of a head row or text cell value; datetimes are tagged so they come back as datetimes
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"can't cache a {type(value).__name__} cell")
+
+
+def decode_cell(value):
+    return datetime.fromisoformat(value["datetime"]) if isinstance(value, dict) else value
+
+
+def save_parsed_export(cache_path, export):
+    """Write an ExportData to a compressed .npz: readings matrix, typed column A, JSON header block.
+
+    Exports holding cell types the cache doesn't know are simply not cached.
+    """
+    import numpy as np
+
+    try:
+        timestamps = encode_values(export.timestamps)
+        meta = json.dumps({
+            "head_rows": [[encode_cell(v) for v in row] for row in export.head_rows],
+            "text_cells": [[r, c, encode_cell(v)] for (r, c), v in export.text_cells.items()],
+        })
+    except TypeError as e:
+        logging.info(f"Not caching parsed export {cache_path}: {e}")
+        return
+    # A temp file of its own, so two workers caching the same export never write to one file
+    handle, temp_path = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(cache_path))
+    try:
+        with os.fdopen(handle, "wb") as f:
+            np.savez_compressed(f, version=np.array(PARSE_CACHE_VERSION), readings=export.readings, meta=np.array(meta),
+                                **{f"timestamp_{name}": array for name, array in timestamps.items()})
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load_parsed_export(cache_path):
+    """Read an ExportData saved by save_parsed_export; None if missing, stale or unreadable.
+
+    An unreadable entry (e.g. one cut short by a full disk) is deleted so it gets written again.
+    """
+    import numpy as np
+
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            if int(data["version"]) != PARSE_CACHE_VERSION:
+                return None
+            meta = json.loads(str(data["meta"]))
+            timestamps = decode_values(*(data[f"timestamp_{name}"] for name in ("kinds", "text", "numbers", "times")))
+            readings = data["readings"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+        logging.info(f"Discarding unreadable parsed export {cache_path}: {e}")
+        try:
+            os.remove(cache_path)
+        except OSError:
+            pass
+        return None
+    os.utime(cache_path)  # keeps the entry from being pruned while it's still in use
+    head_rows = [[decode_cell(v) for v in row] for row in meta["head_rows"]]
+    text_cells = {(r, c): decode_cell(v) for r, c, v in meta["text_cells"]}
+    return ExportData(head_rows, timestamps, readings, text_cells)
+
+
+def prune_parse_cache():
+    cutoff = time.time() - PARSE_CACHE_DAYS * 24 * 3600
+    for name in os.listdir(PARSE_CACHE_FOLDER):
+        path = os.path.join(PARSE_CACHE_FOLDER, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+NUMBER_FORMAT = '#,##0.00'
+TIMESTAMP_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+IRYA_TEXT = "Information Requiring Your Attention"
+
+# Style applied to one streamed cell; fields left as None keep openpyxl's defaults.
+# Plain values here, turned into openpyxl objects by write_streamed_workbook.
+CellStyle = namedtuple("CellStyle", ["number_format", "horizontal", "vertical", "wrap_text", "bold", "fill"],
+                       defaults=[None, None, None, None, None, None])
+
+NUMBER_STYLE = CellStyle(number_format=NUMBER_FORMAT, horizontal="right", vertical="center")
+TIMESTAMP_STYLE = CellStyle(number_format=TIMESTAMP_FORMAT)
+LEFT_STYLE = CellStyle(horizontal="left", vertical="center")
+CENTER_STYLE = CellStyle(horizontal="center", vertical="center")
+HEADER_STYLE = CellStyle(horizontal="center", vertical="center", wrap_text=True)
+BOLD_STYLE = CellStyle(bold=True)
+TITLE_STYLE = CellStyle(bold=True, horizontal="left", vertical="center")
+COUNT_STYLE = CellStyle(number_format="#,##0", horizontal="right", vertical="center")
+PERCENT_STYLE = CellStyle(number_format="0.0%", horizontal="right", vertical="center")
+USAGE_STYLES = {color: CellStyle(number_format=NUMBER_FORMAT, fill=color) for color in ("C6EFCE", "FFC7CE", "FFFF00")}
+
+
+def build_meter_table(ref, headers):
+    from uuid import uuid4
+    from openpyxl.worksheet.filters import AutoFilter
+    from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
+
+    # Write-only sheets can't read the header row back, so the table columns are named up front
+    table = Table(displayName=f"MeterTable_{uuid4().hex[:6]}", ref=ref)
+    table.tableStyleInfo = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
+                                          showLastColumn=False, showRowStripes=True, showColumnStripes=False)
+    table.tableColumns = [TableColumn(id=idx, name=str(header)) for idx, header in enumerate(headers, start=1)]
+    table.autoFilter = AutoFilter(ref=ref)
+    return table
+
+
+AUTOFIT_SAMPLE_ROWS = 500  # taller columns are measured from this many evenly spread values
+
+
+def spread_sample(values, size=AUTOFIT_SAMPLE_ROWS):
+    # Evenly spread picks from a sequence, always keeping the first and last items
+    if len(values) <= size:
+        return values
+    step = (len(values) - 1) / (size - 1)
+    return [values[round(i * step)] for i in range(size)]
+
+
+def longest_text(values):
+    """Length of the longest non-None value in `values` as it reads in a cell; None if there is none.
+
+    A float numpy array (a meter column) is measured from its digit counts: the sign and integer
+    digits of every reading exactly, readings with decimals from a sample that includes the ones
+    with the most integer digits. Any other sequence taller than AUTOFIT_SAMPLE_ROWS is measured
+    from a spread-out sample of its values.
+    """
+    import numpy as np
+
+    if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+        finite = values[np.isfinite(values)]
+        if not len(finite):
+            return None
+        digits = np.floor(np.log10(np.maximum(np.abs(finite), 1))).astype(int) + 1 + (finite < 0)
+        fractional = np.flatnonzero(finite != np.floor(finite))
+        longest = int(digits.max())
+        if len(fractional):
+            widest = fractional[digits[fractional] == digits[fractional].max()]
+            sample = np.concatenate([finite[spread_sample(fractional)], finite[spread_sample(widest)]])
+            longest = max(longest, max(len(repr(v)) for v in sample.tolist()))
+        return longest
+    return max((len(str(v)) for v in spread_sample(values) if v is not None), default=None)
+
+
+def autofit_widths(columns, padding=2, default=10, minimum=0):
+    """Column widths for write_streamed_workbook, sized from the values in memory.
+
+    `columns` has one entry per sheet column from A on, each a list of parts (value sequences or
+    float arrays, measured as in longest_text) that are sized together. A column gets its longest
+    value plus `padding`, `default` standing in for the value when the column is empty, and is
+    never narrower than `minimum` (one number, or one per column).
+    """
+    from openpyxl.utils import get_column_letter
+
+    widths = {}
+    for c, parts in enumerate(columns, start=1):
+        lengths = [length for length in map(longest_text, parts) if length is not None]
+        floor = minimum if isinstance(minimum, (int, float)) else minimum[c - 1]
+        widths[get_column_letter(c)] = max(max(lengths, default=default) + padding, floor)
+    return widths
+
+
+def write_streamed_workbook(output_path, rows, column_widths=None, tables=(), extra_sheets=()):
+    """Save rows to a new workbook in one forward pass with openpyxl's write-only mode.
+
+    `rows` is any iterable of row lists whose items are plain values or (value, CellStyle)
+    pairs, so memory use doesn't grow with the number of rows written. `extra_sheets` adds more
+    sheets after the first, each as a (title, rows, column_widths) triple.
+    """
+    import warnings
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Font, PatternFill
+
+    wb = Workbook(write_only=True)
+
+    # openpyxl objects for each CellStyle, built the first time the style is used
+    style_objects = {}
+
+    def openpyxl_style(style):
+        if style not in style_objects:
+            alignment = font = fill = None
+            if style.horizontal or style.vertical or style.wrap_text:
+                alignment = Alignment(horizontal=style.horizontal, vertical=style.vertical, wrap_text=style.wrap_text)
+            if style.bold:
+                font = Font(bold=True)
+            if style.fill:
+                fill = PatternFill(start_color=style.fill, end_color=style.fill, fill_type="solid")
+            style_objects[style] = (alignment, font, fill)
+        return style_objects[style]
+
+    def write_sheet(title, rows, column_widths):
+        ws = wb.create_sheet(title=title)
+        for col_letter, width in (column_widths or {}).items():
+            ws.column_dimensions[col_letter].width = width
+        for row in rows:
+            cells = []
+            for item in row:
+                if isinstance(item, tuple):
+                    value, style = item
+                    item = WriteOnlyCell(ws, value=value)
+                    alignment, font, fill = openpyxl_style(style)
+                    if style.number_format:
+                        item.number_format = style.number_format
+                    if alignment:
+                        item.alignment = alignment
+                    if font:
+                        item.font = font
+                    if fill:
+                        item.fill = fill
+                cells.append(item)
+            ws.append(cells)
+        return ws
+
+    ws = write_sheet("Sheet1", rows, column_widths)
+    with warnings.catch_warnings():
+        # openpyxl always warns for write-only tables; build_meter_table already fills in the columns
+        warnings.simplefilter("ignore", UserWarning)
+        for table in tables:
+            ws.add_table(table)
+    for title, sheet_rows, sheet_widths in extra_sheets:
+        write_sheet(title, sheet_rows, sheet_widths)
+    wb.save(output_path)
+
+
+def interval_label(interval):
+    minutes = round(interval.total_seconds() / 60)
+    if minutes < 60:
+        return f"{minutes} min"
+    return f"{minutes / 60:g} h" if minutes < 24 * 60 else f"{minutes / (24 * 60):g} d"
+
+
+def completeness_sheet(meter_names, completeness):
+    """The Completeness sheet of an intermediate workbook as a (title, rows, column_widths) triple.
+
+    Lists the expected and actual interval counts of every meter in `meter_names` (one per meter
+    column, None to leave a column out), then every run of missing intervals.
+    """
+    gaps = [gap for gap in completeness["gaps"] if meter_names[gap.column] is not None]
+    rows = [
+        [("Interval", BOLD_STYLE), interval_label(completeness["interval"])],
+        [],
+        [(header, BOLD_STYLE) for header in ("Meter", "Expected Intervals", "Actual Intervals", "Completeness")],
+    ]
+    for k, name in enumerate(meter_names):
+        if name is None:
+            continue
+        expected, actual = int(completeness["expected"][k]), int(completeness["actual"][k])
+        rows.append([name, (expected, COUNT_STYLE), (actual, COUNT_STYLE), (actual / expected, PERCENT_STYLE)])
+    rows += [[], [(header, BOLD_STYLE) for header in ("Meter", "Missing From", "Missing To", "Intervals")]]
+    rows += [[meter_names[gap.column], (gap.start, TIMESTAMP_STYLE), (gap.end, TIMESTAMP_STYLE), (gap.missing, COUNT_STYLE)]
+             for gap in gaps]
+
+    # Sized by the text each column shows: headers, meter names, and timestamps when there are gaps
+    shown_times = [TIMESTAMP_FORMAT] if gaps else []
+    columns = [[["Interval", "Meter"], meter_names], [["Expected Intervals", "Missing From"], shown_times],
+               [["Actual Intervals", "Missing To"], shown_times], [["Completeness", "Intervals"]]]
+    return "Completeness", rows, autofit_widths(columns)
+
+
+def handle_nitrogen_file(input_path, intermediate_subfolder, building, today_str, bill_month, time_str, master_data,
+                         timer=None, cache_path=None):
+    import pandas as pd
     from openpyxl.utils import get_column_letter
-    from openpyxl.worksheet.table import Table, TableStyleInfo
     import os
-    from uuid import uuid4
     import logging
-    from dateutil.parser import parse
 
     filename = os.path.basename(input_path)
+    timer = timer or StageTimer(filename)
     print(f"🔄 Processing file: {filename}")
     logging.info(f"Processing file: {filename}")
 
-    # Load full sheet
-    df = pd.read_excel(input_path, header=None)
+    # Load full sheet (through the same loader and parse cache as the other exports)
+    export = read_export(input_path, cache_path)
+    if export is None:
+        print(f"⚠️ Timestamp not found in: {filename}")
+        logging.warning(f"Timestamp not found in: {filename}")
+        return
+    df = pd.DataFrame(list(export_rows(export)))
+    timer.mark("read")
 
     # Extract Nitrogen title
     title_row_values = df.iloc[0].dropna().astype(str).tolist()
@@ -121,6 +1441,7 @@ def handle_nitrogen_file(input_path, intermediate_subfolder, building, today_str
         if any(isinstance(val, str) and "timestamp" in str(val).lower() for val in row):
             timestamp_row_idx = idx
             break
+    timer.mark("header_detection")
     if timestamp_row_idx is None:
         print(f"⚠️ Timestamp not found in: {filename}")
         logging.warning(f"Timestamp not found in: {filename}")
@@ -133,16 +1454,23 @@ def handle_nitrogen_file(input_path, intermediate_subfolder, building, today_str
     df.columns = headers
     df = df.dropna(axis=1, how='all')
     df = df.rename(columns={df.columns[0]: "Timestamp"})
-
-    # Extract bill_month from first valid timestamp
-    extracted_month = bill_month  # fallback
-    for val in df["Timestamp"]:
-        try:
-            dt = parse(str(val), fuzzy=True)
-            extracted_month = dt.strftime("%B")
-            break
-        except:
-            continue
+    timer.counts.update(rows=len(df), columns=len(df.columns) - 1)
+    timer.mark("column_cleanup")
+
+    # Extract bill_month and the billing period (YYYY-MM) from first valid timestamp
+    timestamp_values = df["Timestamp"].tolist()
+    parsed_times = parse_timestamps(timestamp_values)
+    first_time = first_timestamp(timestamp_values, parsed_times)
+    extracted_month = first_time.strftime("%B") if first_time is not None else bill_month
+    period = first_time.strftime("%Y-%m") if first_time is not None else ""
+    timer.mark("validation")
+
+    # Missing days per meter, from the timestamp steps and the blank cells
+    missing = df.iloc[:, 1:].apply(pd.to_numeric, errors="coerce").isna().to_numpy()
+    completeness = interval_completeness(parsed_times, missing)
+    timer.counts["gaps"] = len(completeness["gaps"])
+    timer.mark("gaps")
+    meter_names = [None] * missing.shape[1]
 
     # Compute usage
     usage_row = {"Timestamp": "Usage"}
@@ -152,12 +1480,15 @@ def handle_nitrogen_file(input_path, intermediate_subfolder, building, today_str
 
     # Append usage values to master_data (for Final output file)
     if master_data is not None:
-        for col in df.columns[1:]:
+        for k, col in enumerate(df.columns[1:]):
             col_data = pd.to_numeric(df[col], errors="coerce").dropna()
             if not col_data.empty:
                 usage = round(col_data.iloc[-1], 2)
-                meter_name = str(col).strip()
-                master_data.append([building, meter_name, usage])
+                meter_name = meter_names[k] = str(col).strip()
+                master_data.append(building, meter_name, usage, filename, extracted_month, "",
+                                   int(completeness["expected"][k]), int(completeness["actual"][k]), period)
+
+    timer.mark("usage")
 
     # Combine final data
     final_df = pd.concat([pd.DataFrame([usage_row]), df], ignore_index=True)
@@ -166,147 +1497,108 @@ def handle_nitrogen_file(input_path, intermediate_subfolder, building, today_str
     output_filename = f"{today_str}_{time_str}_{extracted_month}_{building}.xlsx"
     output_path = os.path.join(intermediate_subfolder, output_filename)
 
-    temp_path = os.path.join(intermediate_subfolder, f"{building.replace(' ', '_')}_temp.xlsx")
-    final_df.to_excel(temp_path, index=False)
-
-    # Format with openpyxl
-    wb = load_workbook(temp_path)
-    sheet = wb.active
-
     # --------- CHANGED: Nitrogen 1x usage on Row 1; keep everything else identical ----------
     base_lower = os.path.splitext(filename)[0].lower()
     is_nitro_1x = re.match(r"^nitrogen\s+(1a|1b|2|3)\b", base_lower) is not None
 
-    if is_nitro_1x and sheet.max_row >= 2:
-        # Swap row 1 (headers) and row 2 (usage) so usage is Row 1, headers Row 2.
-        maxc = sheet.max_column
-        headers_vals = [sheet.cell(row=1, column=c).value for c in range(1, maxc + 1)]
-        usage_vals   = [sheet.cell(row=2, column=c).value for c in range(1, maxc + 1)]
-
-        # Write Usage to row 1
+    headers_vals = final_df.columns.tolist()
+    table_rows = frame_to_rows(final_df)  # Usage row followed by the data rows
+    usage_vals, data_vals = table_rows[0], table_rows[1:]
+    max_col = len(headers_vals)
+
+    def nitrogen_data_cell(c, v):
+        if isinstance(v, (int, float)):
+            return (v, NUMBER_STYLE)
+        if isinstance(v, datetime):
+            return (v, (LEFT_STYLE if c == 1 else CENTER_STYLE)._replace(number_format=TIMESTAMP_FORMAT))
+        return (v, LEFT_STYLE if c == 1 else CENTER_STYLE)
+
+    if is_nitro_1x:
+        # Usage is Row 1, headers Row 2, data from Row 3
+        usage_line = []
         for c, v in enumerate(usage_vals, start=1):
-            cell = sheet.cell(row=1, column=c, value=v)
             if c == 1:
-                cell.value = "Usage"
-                cell.alignment = Alignment(horizontal="left", vertical="center")
-            else:
-                try:
-                    cell.value = float(v)
-                except Exception:
-                    pass
-                cell.number_format = '#,##0.00'
-                cell.alignment = Alignment(horizontal="right", vertical="center")
+                usage_line.append(("Usage", LEFT_STYLE))
+                continue
+            try:
+                v = float(v)
+            except Exception:
+                pass
+            usage_line.append((v, NUMBER_STYLE))
+        header_line = [(str(v) if v is not None else "", LEFT_STYLE if c == 1 else CENTER_STYLE)
+                       for c, v in enumerate(headers_vals, start=1)]
+        top_rows = [usage_line, header_line]
+    else:
+        # Title at Row 1, headers Row 2, usage Row 3, data from Row 4
+        header_line = [(v, NUMBER_STYLE) if c > 1 and isinstance(v, (int, float)) else v
+                       for c, v in enumerate(headers_vals, start=1)]
+        top_rows = [[(title_text, TITLE_STYLE)], header_line, usage_vals]
 
-        # Write headers to row 2
-        for c, v in enumerate(headers_vals, start=1):
-            cell = sheet.cell(row=2, column=c, value=str(v) if v is not None else "")
-            if c == 1:
-                cell.alignment = Alignment(horizontal="left", vertical="center")
-            else:
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # Title row:
-    # - For Nitrogen 1x we SKIP the title (so Usage stays Row 1)
-    # - For all other nitrogen files we keep your original title insertion
-    if not is_nitro_1x:
-        sheet.insert_rows(1)
-        sheet.cell(row=1, column=1).value = title_text
-        sheet.cell(row=1, column=1).font = Font(bold=True)
-        sheet.cell(row=1, column=1).alignment = Alignment(horizontal="left", vertical="center")
-
-    # Decide usage row index for formatting:
-    USAGE_ROW = 1 if is_nitro_1x else 3
-
-    # Keep your little header numeric touch on row 2
-    for col in range(2, sheet.max_column + 1):
-        cell = sheet.cell(row=2, column=col)
-        if isinstance(cell.value, (int, float)):
-            cell.number_format = '#,##0.00'
-            cell.alignment = Alignment(horizontal="right", vertical="center")
-
-    # Widths
-    for col_idx, _ in enumerate(sheet[USAGE_ROW], start=1):
-        col_letter = get_column_letter(col_idx)
-        sheet.column_dimensions[col_letter].width = 28 if col_idx == 1 else 35
-
-    # CHANGED: Apply number formatting to the WHOLE table including the first data row.
-    # Data starts at:
-    # - Row 3 for Nitrogen 1x (Usage at 1, Headers at 2, Data at 3)
-    # - Row 4 otherwise (Title at 1, Headers at 2, Usage at 3, Data at 4)
-    data_start_row = 3 if USAGE_ROW == 1 else 4  # <-- key fix for rounding on the first data row
-    for row in sheet.iter_rows(min_row=data_start_row, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
-        for cell in row:
-            if isinstance(cell.value, (int, float)):
-                cell.number_format = '#,##0.00'
-                cell.alignment = Alignment(horizontal="right", vertical="center")
-            elif cell.column == 1:
-                cell.alignment = Alignment(horizontal="left", vertical="center")
-            else:
-                cell.alignment = Alignment(horizontal="center", vertical="center")
+    data_start_row = len(top_rows) + 1
+    last_row = len(top_rows) + len(data_vals)
+
+    # Widths: at least the usual 28 (Timestamp) / 35 (meters), wider where a header or value needs it
+    sample_rows = [usage_vals] + spread_sample(data_vals)
+    columns = [[[header], [row[c] for row in sample_rows]] for c, header in enumerate(headers_vals)]
+    column_widths = autofit_widths(columns, minimum=[28] + [35] * (max_col - 1))
 
     # Build table (starts at A2 so headers are included, Usage row is a separate top row)
-    if sheet.max_row >= data_start_row:
+    tables = []
+    if last_row >= data_start_row:
         try:
-            last_col = get_column_letter(sheet.max_column)
-            last_row = sheet.max_row
-            table_range = f"A2:{last_col}{last_row}"
-            table = Table(
-                displayName=f"MeterTable_{uuid4().hex[:6]}",
-                ref=table_range
-            )
-            style = TableStyleInfo(
-                name="TableStyleMedium9",
-                showFirstColumn=False,
-                showLastColumn=False,
-                showRowStripes=True,
-                showColumnStripes=False
-            )
-            table.tableStyleInfo = style
-            sheet.add_table(table)
+            table_headers = [v if not isinstance(v, tuple) else v[0] for v in top_rows[1]]
+            tables.append(build_meter_table(f"A2:{get_column_letter(max_col)}{last_row}", table_headers))
         except Exception as e:
             print(f"⚠️ Could not apply table style to {filename}: {e}")
             logging.warning(f"Could not apply table style to {filename}: {e}")
 
-    wb.save(output_path)
-    if os.path.exists(temp_path):
-        os.remove(temp_path)
+    timer.mark("styling")
+
+    # Stream the final layout straight into the output workbook
+    def styled_rows():
+        yield from top_rows
+        for row in data_vals:
+            yield [nitrogen_data_cell(c, v) for c, v in enumerate(row, start=1)]
+
+    extra_sheets = [completeness_sheet(meter_names, completeness)] if completeness["interval"] is not None else []
+    write_streamed_workbook(output_path, styled_rows(), column_widths, tables, extra_sheets)
+    timer.mark("save")
 
     print(f"✅ Completed file: {filename}")
     logging.info(f"Completed file: {filename} - saved to {output_path}")
+    return output_path
+
 
+def format_excel(input_path, intermediate_subfolder, master_data, building_name, today_str, bill_month, time_str,
+                 timer=None, cache_path=None):
+    import numpy as np
+    from openpyxl.utils import get_column_letter
 
-def format_excel(input_path, intermediate_subfolder, master_data, building_name, today_str, bill_month, time_str):
     filename = os.path.basename(input_path)
+    timer = timer or StageTimer(filename)
     print(f"🔄 Processing file: {filename}")
     logging.info(f"Processing file: {filename}")
 
+    # Stream the export into a compact block instead of loading every cell into memory
     try:
-        df = pd.read_excel(input_path)
-        base_name = os.path.splitext(filename)[0]
-        temp_path = os.path.join(intermediate_subfolder, f"{base_name}_cleaned.xlsx")
-        df.to_excel(temp_path, index=False)
+        export = read_export(input_path, cache_path)
+        timer.mark("read")
     except Exception as e:
         print(f"❌ Failed to clean and convert file {filename}: {e}")
         logging.error(f"Failed to clean and convert file {filename}: {e}")
         return
 
-    wb = load_workbook(temp_path)
-    sheet = wb.active
-
-    timestamp_row = None
-    for row in sheet.iter_rows(min_row=1, max_row=30):
-        for cell in row:
-            if cell.value and "timestamp" in str(cell.value).lower():
-                timestamp_row = cell.row
-                break
-        if timestamp_row:
-            break
-
-    if timestamp_row is None:
+    if export is None:
         print(f"⚠️ Timestamp not found in: {filename}")
         logging.warning(f"Timestamp not found in: {filename}")
         return
 
+    head = export.head_rows  # rows above the data, header row last
+    width = len(head[-1])
+    timestamps = export.timestamps
+    readings = export.readings
+    text_cells = export.text_cells
+
     # Identify ABB here so we can tweak ONLY the top blank rows behavior
     base_lower = os.path.splitext(filename)[0].lower()
     is_abb = base_lower.startswith("abb ") or base_lower.startswith("abb_") or base_lower.startswith("abb")
@@ -314,164 +1606,150 @@ def format_excel(input_path, intermediate_subfolder, master_data, building_name,
     # Information Requiring Your Attention (IRYA) section handling
     irya_found = False
     irya_start = 1
-    for i in range(1, timestamp_row):
-        if sheet.cell(row=i, column=1).value and "Information Requiring Your Attention" in str(sheet.cell(row=i, column=1).value):
+    for i, row in enumerate(head[:-1], start=1):
+        if row[0] and IRYA_TEXT in str(row[0]):
             irya_start = i
             irya_found = True
-            sheet.cell(row=i, column=1).font = Font(bold=True)
 
+    # Trim the banner with one slice instead of shifting rows one at a time
     if irya_found:
-        for _ in range(irya_start - 1):
-            sheet.delete_rows(1)
-        timestamp_row -= (irya_start - 1)
+        # Keep the IRYA section; everything above it goes
+        head = head[irya_start - 1:]
     else:
-        # Delete rows above the timestamp row, so timestamp becomes Row 1
-        for _ in range(timestamp_row - 1):
-            sheet.delete_rows(1)
-        # CHANGED: For ABB, insert ONLY 1 row (so Usage ends up at Row 1, Headers at Row 2, Data at Row 3)
-        #          For everything else, keep your original 3 inserted rows.
-        if is_abb:
-            sheet.insert_rows(1)          # insert 1
-            timestamp_row = 2             # Timestamp is now on Row 2
-        else:
-            for _ in range(3):
-                sheet.insert_rows(1)      # insert 3 (original behavior)
-            timestamp_row = 4
+        # Timestamp row with blank rows above it for the usage row.
+        # CHANGED: For ABB, only 1 blank row (so Usage ends up at Row 1, Headers at Row 2, Data at Row 3)
+        #          For everything else, keep your original 3 blank rows.
+        blank_rows = 1 if is_abb else 3
+        head = [[None] * width for _ in range(blank_rows)] + head[-1:]
+    timestamp_row = len(head)
 
     first_data_row = timestamp_row + 1
-    last_data_row = sheet.max_row
-
-    for col_idx in reversed(range(2, sheet.max_column + 1)):
-        col_values = [sheet.cell(row=r, column=col_idx).value for r in range(first_data_row, last_data_row + 1)]
-        if all((v is None or str(v).strip() == "") for v in col_values):
-            sheet.delete_cols(col_idx)
-
-    meter_labels = [cell.value for cell in sheet[timestamp_row]]
-
-    for col_idx, cell in enumerate(sheet[timestamp_row], start=1):
-        if cell.value:
-            original = str(cell.value).strip()
-            lines = []
-
-            # Extract leading part (e.g., "06.06ME1")
-            match = re.match(r"^([\d.]+[A-Z]*\d*)", original)
-            if match:
-                number_part = match.group(1)
-                lines.append(number_part)
-                rest = original[len(number_part):].strip()
-            else:
-                rest = original
-
-            # Extract unit like (kWh)
-            unit = ""
-            if "(" in rest and ")" in rest:
-                rest_parts = rest.split("(", 1)
-                rest = rest_parts[0].strip()
-                unit = f"({rest_parts[1].strip(')')})"
-
-            if rest:
-                lines.append(rest)
-            if unit:
-                lines.append(unit)
-
-            formatted = "\n".join(lines)
-            cell.value = formatted
-            cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-            # Adjust column width to be tighter
-            col_letter = get_column_letter(col_idx)
-            max_line_length = max(len(line.strip()) for line in lines)
-            sheet.column_dimensions[col_letter].width = max_line_length + 2  # small buffer
+    timer.mark("header_detection")
+
+    # Drop every meter column with no readings and nothing but blank text, in one go
+    has_data = ~np.isnan(readings).all(axis=0)
+    for (r, c), v in text_cells.items():
+        if not has_data[c] and not is_blank(v):
+            has_data[c] = True
+    keep = np.flatnonzero(has_data)
+    if len(keep) < readings.shape[1]:
+        readings = readings[:, keep]
+        new_index = {old: new for new, old in enumerate(keep.tolist())}
+        text_cells = {(r, new_index[c]): v for (r, c), v in text_cells.items() if c in new_index}
+        head = [[row[0]] + [row[k + 1] for k in keep] for row in head]
+    width = len(head[-1])
+    timer.counts.update(rows=readings.shape[0], columns=readings.shape[1])
+    timer.mark("column_cleanup")
+
+    header_row = head[timestamp_row - 1]
+    meter_labels = list(header_row)
+
+    header_cols = set()
+    for c, value in enumerate(header_row, start=1):
+        if value:
+            header_row[c - 1] = format_meter_header(value)
+            header_cols.add(c)
+    timer.mark("header_format")
 
     usage_row_index = timestamp_row - 1
-    usage_cells = []
+    usage_colors = {}  # column -> fill color of its usage cell
 
-    for i, col in enumerate(sheet.iter_cols(min_row=first_data_row, min_col=2), start=2):
-        values = [(row, cell.value) for row, cell in enumerate(col, start=first_data_row) if isinstance(cell.value, (int, float))]
-        if len(values) < 2:
-            continue
+    n_rows, meter_count = readings.shape
+    last_data_row = timestamp_row + n_rows
+    blanks = np.isnan(readings)
+    for (r, c), v in text_cells.items():
+        blanks[r, c] = is_blank(v)
 
-        first_row, first = values[0]
-        last_row, last = values[-1]
-        flip_value = None
-        for j in range(1, len(values)):
-            prev_val = values[j - 1][1]
-            curr_val = values[j][1]
-            if prev_val != 0 and abs(curr_val / prev_val) < 0.1:
-                flip_value = prev_val
-                break
+    is_cogen = "cogen" in building_name.lower()
+    meter_usage = compute_meter_usage(readings, is_cogen)
+    timer.mark("usage")
 
-        is_cogen = "cogen" in building_name.lower()
-        usage = (round_to_nearest_power_of_10(flip_value, is_cogen) - first + last) if flip_value and ((last < first and not is_cogen) or (last > first and is_cogen)) else last - first
+    parsed_times = parse_timestamps(timestamps)
+    if len(parsed_times):
+        boundaries_ok = month_boundary_flags(parsed_times[meter_usage["first_idx"]], parsed_times[meter_usage["last_idx"]])
+    else:
+        boundaries_ok = np.zeros(meter_count, dtype=bool)
+    first_time = first_timestamp(timestamps, parsed_times)
+    bill_month_final = first_time.strftime("%B") if first_time is not None else bill_month
+    period = first_time.strftime("%Y-%m") if first_time is not None else ""
+    timer.mark("validation")
+
+    # Missing intervals per meter, from the timestamp steps and the blank cells
+    completeness = interval_completeness(parsed_times, blanks)
+    timer.counts["gaps"] = len(completeness["gaps"])
+    timer.mark("gaps")
+    meter_names = [None] * meter_count  # clean name of each meter with a usage figure
+
+    for k in np.flatnonzero(meter_usage["valid"]):
+        i = k + 2
+        first_idx = int(meter_usage["first_idx"][k])
+        last_idx = int(meter_usage["last_idx"][k])
+        usage = float(meter_usage["usage"][k])
+        if all(readings[idx, k].is_integer() for idx in (first_idx, last_idx)):
+            usage = int(usage)  # whole-number registers stay whole numbers, as in the sheet
 
         raw_meter_name = meter_labels[i - 1] if i - 1 < len(meter_labels) else f"Meter {i}"
         clean_meter = extract_clean_meter_name(str(raw_meter_name))
 
-        try:
-            first_time = parse(str(sheet.cell(row=first_row, column=1).value))
-            last_time = parse(str(sheet.cell(row=last_row, column=1).value))
-            next_month = 1 if first_time.month == 12 else first_time.month + 1
-            next_year = first_time.year + 1 if first_time.month == 12 else first_time.year
-            correct = (
-                first_time.day == 1 and first_time.strftime("%I:%M %p") == "12:15 AM" and
-                last_time.day == 1 and last_time.month == next_month and last_time.year == next_year and
-                last_time.strftime("%I:%M %p") == "12:00 AM"
-            )
-        except:
-            correct = False
-
+        correct = bool(boundaries_ok[k])
         color = "C6EFCE" if correct else "FFC7CE"
-        if correct:
-            for r in range(first_row + 1, last_row):
-                val = sheet.cell(row=r, column=col[0].column).value
-                if val is None or str(val).strip() == "":
-                    color = "FFFF00"
-                    break
-
-        usage_cell = sheet.cell(row=usage_row_index, column=col[0].column)
-        usage_cell.value = round(usage, 2)
-        usage_cell.number_format = '#,##0.00'
-        usage_cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-        usage_cells.append(usage_cell)
-        master_data.append([building_name, clean_meter, round(usage, 2)])
+        if correct and completeness["interior"][k]:
+            color = "FFFF00"
+
+        head[usage_row_index - 1][i - 1] = round(usage, 2)
+        usage_colors[i] = color
+        meter_names[k] = clean_meter
+        master_data.append(building_name, clean_meter, round(usage, 2), filename, bill_month_final, USAGE_STATUS[color],
+                           int(completeness["expected"][k]), int(completeness["actual"][k]), period)
+
+    # Every register rollover and reset the usage above accounts for goes to the log
+    for event in meter_usage["events"]:
+        raw_meter_name = meter_labels[event.column + 1] if event.column + 1 < len(meter_labels) else f"Meter {event.column + 2}"
+        logging.info(f"{filename}: {event.kind} on {extract_clean_meter_name(str(raw_meter_name))} at "
+                     f"{timestamps[event.row]} ({plain_number(event.before)} -> {plain_number(event.after)})")
+    rollovers, resets = int(meter_usage["rollovers"].sum()), int(meter_usage["resets"].sum())
+    if rollovers or resets:
+        print(f"🔁 {filename}: {rollovers} rollover(s) and {resets} reset(s) included in usage - see the log.")
+    timer.counts.update(rollovers=rollovers, resets=resets)
+
+    timer.mark("usage")
+
+    def data_value(i, k):
+        # Final cell value of meter column k on data row i
+        v = readings[i, k]
+        if v == v:
+            return plain_number(float(v))
+        return text_cells.get((i, k))
+
+    tables = []
+    extra_cells = {}  # (row, column) -> value written outside the head rows and interval block
+    summary_value_col = None
 
     # Only add summary if it's the "IESO and Hospital" sheet
     if "IESO and Hospital" in filename or "IESO_Hospital" in filename:
         try:
-            from openpyxl.worksheet.table import Table, TableStyleInfo
-
             # Detect last meter data column
             last_meter_col = 1
-            for col in range(2, sheet.max_column + 1):
-                header_val = sheet.cell(row=timestamp_row, column=col).value
+            for col in range(2, width + 1):
+                header_val = header_row[col - 1]
                 if header_val and str(header_val).strip():
                     last_meter_col = col
 
-            # Detect how many actual data rows exist under the timestamp
-            first_data_row = timestamp_row + 1
-            last_data_row = sheet.max_row
-            data_row_count = 0
-            for r in range(first_data_row, last_data_row + 1):
-                has_data = any(
-                    sheet.cell(row=r, column=c).value not in [None, ""]
-                    for c in range(2, last_meter_col + 1)
-                )
-                if has_data:
-                    data_row_count += 1
-                else:
-                    break  # Stop at first empty row
+            # Detect how many actual data rows exist under the timestamp (stop at the first empty row)
+            has_data = ~np.isnan(readings[:, :last_meter_col - 1])
+            for (r, c), v in text_cells.items():
+                if c < last_meter_col - 1 and v != "":
+                    has_data[r, c] = True
+            row_has_data = has_data.any(axis=1)
+            data_row_count = n_rows if row_has_data.all() else int(row_has_data.argmin())
 
             row_end = first_data_row + data_row_count - 1
 
             if row_end > timestamp_row and last_meter_col >= 1:
                 last_col_letter = get_column_letter(last_meter_col)
                 meter_table_ref = f"A{timestamp_row}:{last_col_letter}{row_end}"
-
-                table = Table(displayName=f"MeterTable_{uuid4().hex[:6]}", ref=meter_table_ref)
-                style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
-                                       showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-                table.tableStyleInfo = style
-                sheet.add_table(table)
+                headers = header_row[:last_meter_col]
+                tables.append(build_meter_table(meter_table_ref, headers))
             else:
                 print(f"⚠️ Skipping table formatting for {filename}: insufficient data rows.")
         except Exception as e:
@@ -480,196 +1758,929 @@ def format_excel(input_path, intermediate_subfolder, master_data, building_name,
         ieso_total = 0
         hospital_total = 0
 
-        for cell in usage_cells:
-            meter_header = sheet.cell(row=timestamp_row, column=cell.column).value
+        for col in usage_colors:
+            meter_header = header_row[col - 1]
             if not meter_header:
                 continue
 
             normalized = str(meter_header).replace("\n", "").replace(" ", "")
+            usage_value = head[usage_row_index - 1][col - 1]
 
             if "12T1Q1" in normalized or "12T2Q3" in normalized:
-                ieso_total += cell.value or 0
+                ieso_total += usage_value or 0
             if "12M14A" in normalized or "12M21" in normalized:
-                hospital_total += cell.value or 0
+                hospital_total += usage_value or 0
 
         university_total = ieso_total - hospital_total
 
-        base_col = sheet.max_column + 3  # Write 3 columns to the right of existing content
-        sheet.cell(row=usage_row_index, column=base_col, value="IESO Purchased:")
-        sheet.cell(row=usage_row_index, column=base_col + 1, value=round(ieso_total, 2))
-
-        sheet.cell(row=usage_row_index + 1, column=base_col, value="Hospital Usage:")
-        sheet.cell(row=usage_row_index + 1, column=base_col + 1, value=round(hospital_total, 2))
-
-        sheet.cell(row=usage_row_index + 2, column=base_col, value="University Usage:")
-        sheet.cell(row=usage_row_index + 2, column=base_col + 1, value=round(university_total, 2))
-
-        # Format the summary values to look clean and readable
-        for r in range(usage_row_index, usage_row_index + 3):
-            val_cell = sheet.cell(row=r, column=base_col + 1)
-            val_cell.number_format = '#,##0.00'
-            val_cell.alignment = Alignment(horizontal="right", vertical="center")
-
-        # Widen the summary columns
-        for c in [base_col, base_col + 1]:
-            col_letter = get_column_letter(c)
-            sheet.column_dimensions[col_letter].width = 20
-
-    # Column width and number formatting pass
-    for col in sheet.iter_cols(min_row=usage_row_index + 1, max_row=sheet.max_row, min_col=1, max_col=sheet.max_column):
-        col_letter = get_column_letter(col[0].column)
-        max_len = max((len(str(cell.value)) for cell in col if cell.value is not None), default=10)
-        sheet.column_dimensions[col_letter].width = max_len + 2  # Ensure values fit cleanly
-
-        for cell in col:
-            if isinstance(cell.value, (int, float)):
-                cell.number_format = '#,##0.00'
-                cell.alignment = Alignment(horizontal='right', vertical='center')
-            elif isinstance(cell.value, str) and col[0].column == 1:
-                cell.alignment = Alignment(horizontal='left', vertical='center')  # Timestamp stays left-aligned
+        base_col = width + 3  # Write 3 columns to the right of existing content
+        extra_cells[(usage_row_index, base_col)] = "IESO Purchased:"
+        extra_cells[(usage_row_index, base_col + 1)] = round(ieso_total, 2)
+
+        extra_cells[(usage_row_index + 1, base_col)] = "Hospital Usage:"
+        extra_cells[(usage_row_index + 1, base_col + 1)] = round(hospital_total, 2)
+
+        extra_cells[(usage_row_index + 2, base_col)] = "University Usage:"
+        extra_cells[(usage_row_index + 2, base_col + 1)] = round(university_total, 2)
+        summary_value_col = base_col + 1
+
+    max_row = max([last_data_row] + [r for r, _ in extra_cells])
+    max_col = max([width] + [c for _, c in extra_cells])
+
+    def head_value(r, c):
+        if (r, c) in extra_cells:
+            return extra_cells[(r, c)]
+        return head[r - 1][c - 1] if c <= width else None
+
+    # Column widths: longest value from the usage row down, with a small buffer. Meter columns are
+    # sized from the readings array and their few text cells rather than cell by cell.
+    text_by_column = {}
+    for (i, k), v in text_cells.items():
+        if readings[i, k] != readings[i, k]:
+            text_by_column.setdefault(k, []).append(v)
+    columns = []
+    for c in range(1, max_col + 1):
+        parts = [[head_value(r, c) for r in range(usage_row_index + 1, timestamp_row + 1)]]
+        if c == 1:
+            parts.append(timestamps)
+        elif c - 2 < meter_count:
+            parts += [readings[:, c - 2], text_by_column.get(c - 2, [])]
+        parts.append([v for (r, col), v in extra_cells.items() if col == c and r > timestamp_row])
+        columns.append(parts)
+    column_widths = autofit_widths(columns)
 
     # Apply a table style to the main data if not already styled (non-IESO sheet)
     if "IESO and Hospital" not in filename:
         try:
-            from openpyxl.worksheet.table import Table, TableStyleInfo
-
-            meter_table_ref = f"A{timestamp_row}:{get_column_letter(sheet.max_column)}{sheet.max_row}"
-            table = Table(displayName=f"MeterTable_{uuid4().hex[:6]}", ref=meter_table_ref)
-
-            style = TableStyleInfo(name="TableStyleMedium9", showFirstColumn=False,
-                                   showLastColumn=False, showRowStripes=True, showColumnStripes=False)
-            table.tableStyleInfo = style
-
-            sheet.add_table(table)
+            meter_table_ref = f"A{timestamp_row}:{get_column_letter(max_col)}{max_row}"
+            headers = [head_value(timestamp_row, c) for c in range(1, max_col + 1)]
+            tables.append(build_meter_table(meter_table_ref, headers))
         except Exception as e:
             print(f"⚠️ Could not apply table style to intermediate file {filename}: {e}")
             logging.error(f"Could not apply table style to intermediate file {filename}: {e}")
 
-    # Dynamically determine bill_month from first datetime under timestamp
-    bill_month_final = bill_month  # default fallback
-    for row in range(timestamp_row + 1, sheet.max_row + 1):
-        val = sheet.cell(row=row, column=1).value
-        try:
-            dt = parse(str(val), fuzzy=True)
-            bill_month_final = dt.strftime("%B")
-            break
-        except:
-            continue
+    def cell_style(r, c, v):
+        if r == usage_row_index:
+            if c in usage_colors:
+                return USAGE_STYLES[usage_colors[c]]
+            if c == summary_value_col:
+                return NUMBER_STYLE
+        if r > usage_row_index:
+            if isinstance(v, (int, float)):
+                return NUMBER_STYLE
+            if isinstance(v, datetime):
+                return TIMESTAMP_STYLE  # same display pandas used for native Excel dates
+            if isinstance(v, str) and c == 1:
+                return LEFT_STYLE  # Timestamp stays left-aligned
+            if r == timestamp_row and c in header_cols:
+                return HEADER_STYLE
+        elif c == 1 and v and IRYA_TEXT in str(v):
+            return BOLD_STYLE
+        return None
+
+    # Stream the final layout (IRYA rows, usage row, headers, data) into the output workbook
+    def styled_rows():
+        for r in range(1, max_row + 1):
+            if r <= timestamp_row:
+                values = [head_value(r, c) for c in range(1, max_col + 1)]
+            else:
+                i = r - first_data_row
+                values = [timestamps[i]] + [data_value(i, k) for k in range(meter_count)] if i < n_rows else []
+                extras = [(c, v) for (row, c), v in extra_cells.items() if row == r]
+                if extras:
+                    values += [None] * (max_col - len(values))
+                    for c, v in extras:
+                        values[c - 1] = v
+            row = []
+            for c, v in enumerate(values, start=1):
+                style = cell_style(r, c, v)
+                row.append((v, style) if style else v)
+            yield row
+
+    timer.mark("styling")
 
     output_filename = f"{today_str}_{time_str}_{bill_month_final}_{building_name}.xlsx"
     output_path = os.path.join(intermediate_subfolder, output_filename)
-    wb.save(output_path)
-    if os.path.exists(temp_path) and temp_path != input_path:
-        os.remove(temp_path)
+    extra_sheets = [completeness_sheet(meter_names, completeness)] if completeness["interval"] is not None else []
+    write_streamed_workbook(output_path, styled_rows(), column_widths, tables, extra_sheets)
+    timer.mark("save")
     print(f"✅ Completed file: {filename}")
     logging.info(f"Completed file: {filename} - saved to {output_path}")
+    return output_path
+
+
+def process_file(file_path, intermediate_subfolder, today_str, bill_month, time_str, cache_path=None):
+    """Run the matching handler for one export.
+
+    Returns the usage rows it produced, the intermediate file it wrote (None if it failed) and
+    its stage timings. Kept at module level so it can be sent to worker processes.
+    `cache_path` is where its parsed form is cached (see read_export).
+    """
+    file = os.path.basename(file_path)
+    building = clean_building_name(file)
+    rows = MasterData()
+    timer = StageTimer(file)
+
+    if re.match(r"^nitrogen\s+\d+[a-z]?$", os.path.splitext(file)[0].lower()):
+        output_path = handle_nitrogen_file(file_path, intermediate_subfolder, building, today_str, bill_month, time_str, rows,
+                                           timer, cache_path)
+    else:
+        output_path = format_excel(file_path, intermediate_subfolder, rows, building, today_str, bill_month, time_str,
+                                   timer, cache_path)
+    return rows, output_path, timer.record()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_ledger():
+    """The ledger's entries, without those whose output is gone or that are older than LEDGER_DAYS."""
+    try:
+        with open(LEDGER_PATH, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != LEDGER_VERSION:
+        return {}
+    cutoff = (date.today() - timedelta(days=LEDGER_DAYS)).isoformat()
+    return {digest: entry for digest, entry in data.get("files", {}).items()
+            if entry.get("saved", "") >= cutoff and os.path.exists(entry.get("output", ""))}
+
+
+def save_ledger(entries):
+    temp_path = LEDGER_PATH + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        # default= turns any NumPy scalar usage values into plain numbers
+        json.dump({"version": LEDGER_VERSION, "files": entries}, f, indent=1, default=lambda value: value.item())
+    os.replace(temp_path, LEDGER_PATH)
+
+
+def reuse_ledger_entry(entry, building, intermediate_subfolder, today_str, time_str):
+    """Copy a previously produced intermediate file into this run and return its cached result.
+
+    Returns None when there is nothing usable to reuse (different building or the old output is gone).
+    """
+    if not entry or entry.get("building") != building or not os.path.exists(entry.get("output", "")):
+        return None
+    output_path = os.path.join(intermediate_subfolder, f"{today_str}_{time_str}_{entry['name_suffix']}")
+    shutil.copyfile(entry["output"], output_path)
+    return MasterData.from_records(entry["rows"]), output_path
+
+
+def save_run_metrics(run):
+    """Append one run's timings to the metrics file as a single JSON line."""
+    try:
+        with open(METRICS_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(run, default=lambda value: value.item()) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not save run metrics: {e}")
+        logging.warning(f"Could not save run metrics: {e}")
+
+
+def report_run_metrics(run):
+    """Print and log the slowest files and the total time spent in each stage."""
+    files = sorted(run["files"], key=lambda entry: entry["seconds"], reverse=True)
+    stage_totals = {}
+    for entry in files + [run["master"]]:
+        for stage, seconds in entry["stages"].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+
+    lines = [f"⏱️ Run took {run['seconds']:.1f}s for {len(files)} files."]
+    if files:
+        lines.append("Slowest files:")
+        lines += [f"  {entry['seconds']:8.2f}s  {entry['file']}" for entry in files[:SLOWEST_SHOWN]]
+    if stage_totals:
+        lines.append("Time by stage:")
+        lines += [f"  {seconds:8.2f}s  {stage}"
+                  for stage, seconds in sorted(stage_totals.items(), key=lambda item: item[1], reverse=True)]
+    print("\n".join(lines))
+    logging.info("\n".join(lines))
+
+
+def publish_batch(intermediate_subfolder, final_folder_path, master_scratch_path=None, master_path=None):
+    """Move a finished run from the scratch folder into the OneDrive Intermediate and Output folders."""
+    if os.path.exists(final_folder_path):
+        raise FileExistsError(f"❌ Intermediate folder already exists: {final_folder_path}")
+    shutil.move(intermediate_subfolder, final_folder_path)
+    if master_scratch_path:
+        if os.path.exists(master_path):
+            os.remove(master_path)
+        shutil.move(master_scratch_path, master_path)
+
+
+def billing_period(month_name, today):
+    """"YYYY-MM" for a bill month name, taking the latest such month not after `today`.
+
+    Only a fallback for rows whose export had no timestamp to take the period from.
+    """
+    try:
+        month = datetime.strptime(month_name, "%B").month
+    except ValueError:
+        return None
+    year = today.year if month <= today.month else today.year - 1
+    return f"{year}-{month:02d}"
+
+
+def usage_frame(master_data, today):
+    """master_data as a DataFrame of building, meter, usage, billing period ("YYYY-MM"), status and source file.
+
+    The period is the one recorded from each export's timestamps, or guessed from the bill month
+    and `today` (billing_period) for rows without one.
+    """
+    frame = master_data.to_frame()
+    guessed = {month: billing_period(month, today) for month in frame["bill_month"].cat.categories}
+    period = frame["period"].astype(object)
+    period = period.where(period != "", frame["bill_month"].astype(object).map(guessed))
+    return plain_text_columns(frame.assign(period=period),
+                              ["building", "meter", "period", "status", "source_file"])[
+        ["building", "meter", "usage", "period", "status", "source_file"]]
+
+
+def plain_text_columns(frame, names):
+    # Categorical text columns back to plain strings (None where missing), for merging and SQLite
+    return frame.assign(**{name: frame[name].astype(object).where(frame[name].notna(), None) for name in names})
+
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meter_usage (
+    building TEXT NOT NULL,
+    meter TEXT NOT NULL,
+    month TEXT NOT NULL,        -- billing period, YYYY-MM
+    usage REAL NOT NULL,
+    status TEXT,                -- validation status of the usage value
+    source_file TEXT,
+    run TEXT,                   -- run that last wrote the row, YYYY-MM-DD_HH-MM
+    meter_id TEXT,              -- leading ID of the meter label (see meter_id)
+    PRIMARY KEY (building, meter, month)
+);
+CREATE INDEX IF NOT EXISTS meter_usage_by_month ON meter_usage (month);
+"""
+
+METER_ID_PATTERN = re.compile(r"^\s*(\d\S*)")  # first word of the label when it starts with a digit
+
+
+def meter_id(meter):
+    """Leading ID of a meter label ("06.06ME1" for "06.06ME1 Main Feed (kWh)"); labels without one are their own ID."""
+    match = METER_ID_PATTERN.match(meter)
+    return match.group(1).upper() if match else meter.strip()
+
+
+def open_history(path=None):
+    """Connection to the meter history database (created on first use)."""
+    connection = sqlite3.connect(path or HISTORY_PATH, timeout=30)
+    connection.executescript(HISTORY_SCHEMA)
+    if "meter_id" not in {column[1] for column in connection.execute("PRAGMA table_info(meter_usage)")}:
+        # Databases from before meter IDs had a column of their own get it filled in from the labels
+        connection.create_function("meter_id", 1, meter_id, deterministic=True)
+        with connection:
+            connection.execute("ALTER TABLE meter_usage ADD COLUMN meter_id TEXT")
+            connection.execute("UPDATE meter_usage SET meter_id = meter_id(meter)")
+    connection.execute("CREATE INDEX IF NOT EXISTS meter_usage_by_meter_id ON meter_usage (meter_id, month)")
+    return connection
+
+
+def record_usage_history(current, run):
+    """Upsert this run's usage rows; a meter's latest value for a month replaces the earlier one."""
+    rows = current.dropna(subset=["period"])
+    with open_history() as connection:
+        connection.executemany(
+            """INSERT INTO meter_usage (building, meter, month, usage, status, source_file, run, meter_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (building, meter, month) DO UPDATE SET
+                   usage = excluded.usage, status = excluded.status,
+                   source_file = excluded.source_file, run = excluded.run""",
+            zip(rows["building"], rows["meter"], rows["period"], rows["usage"].astype(float),
+                rows["status"], rows["source_file"], [run] * len(rows), map(meter_id, rows["meter"])))
+    connection.close()
+
+
+def query_history(where="", params=(), path=None):
+    """Rows of the meter history as a DataFrame (building, meter, month, usage, status, source_file, run)."""
+    import pandas as pd
+
+    connection = open_history(path)
+    try:
+        return pd.read_sql_query(f"SELECT building, meter, month, usage, status, source_file, run FROM meter_usage "
+                                 f"{where}", connection, params=params)
+    finally:
+        connection.close()
+
+
+def meter_history(meter, building=None, months=24, path=None):
+    """Monthly usage of one meter (optionally in one building) over its latest `months` months, oldest first.
 
+    `meter` is the meter's ID or its full label; either way the lookup goes by meter_id.
+    """
+    where = "WHERE meter_id = ?" + (" AND building = ?" if building else "")
+    params = (meter_id(meter), building) if building else (meter_id(meter),)
+    frame = query_history(f"{where} ORDER BY month DESC LIMIT ?", params + (months,), path)
+    return frame.iloc[::-1].reset_index(drop=True)
 
-def main():
+
+def month_usage(month, path=None):
+    """Every meter's usage for one billing month ("YYYY-MM")."""
+    return query_history("WHERE month = ? ORDER BY building, meter", (month,), path)
+
+
+def load_usage_history(current):
+    """History rows for the calendar months present in `current`, as building/meter/period/usage."""
+    months = sorted({period[5:7] for period in current["period"].dropna()})
+    frame = query_history(f"WHERE substr(month, 6, 2) IN ({', '.join('?' * len(months))})", tuple(months))
+    return frame.rename(columns={"month": "period"}).astype({"usage": float})[["building", "meter", "period", "usage"]]
+
+
+def detect_abnormal_usage(current, history):
+    """Year-over-year status for every row of `current` (see usage_frame), in one vectorized pass.
+
+    Each row is compared with the mean usage of the same building, meter and calendar month over
+    the previous ABNORMAL_YEARS years of `history`. Returns a list of status strings.
+    """
+    import numpy as np
+    import pandas as pd
+
+    def split_period(frame):
+        period = frame["period"].fillna("").astype(str)
+        return frame.assign(year=pd.to_numeric(period.str[:4], errors="coerce"),
+                            month=pd.to_numeric(period.str[5:7], errors="coerce"))
+
+    cur = split_period(current).assign(row=np.arange(len(current)))
+    past = split_period(history)
+    matched = cur[["row", "building", "meter", "year", "month"]].merge(
+        past[["building", "meter", "year", "month", "usage"]], on=["building", "meter", "month"], suffixes=("", "_past"))
+    matched = matched[(matched["year_past"] < matched["year"]) & (matched["year_past"] >= matched["year"] - ABNORMAL_YEARS)]
+    baseline = matched.groupby("row")["usage"].mean().reindex(cur["row"]).to_numpy(dtype=float)
+
+    usage = cur["usage"].to_numpy()
+    comparable = ~np.isnan(baseline) & (np.abs(np.nan_to_num(baseline)) >= ABNORMAL_MIN_BASELINE)
+    # Change relative to the baseline's size, so a negative baseline (cogen export) keeps the direction
+    change = np.where(comparable, (usage - baseline) / np.abs(np.where(comparable, baseline, 1.0)), 0.0)
+    percent = pd.Series(np.round(change * 100).astype(int)).map("{:+d}%".format)
+    status = np.select(
+        [~comparable, change >= ABNORMAL_HIGH, change <= -ABNORMAL_LOW],
+        ["no history", "high (" + percent + " vs prior years)", "low (" + percent + " vs prior years)"],
+        "normal")
+    return status.tolist()
+
+
+MASTER_HEADERS = ["Building", "Meter", "Usage"]
+INTERVAL_HEADERS = ["Readings", "Expected", "Completeness"]  # intervals with a reading, intervals in the export
+ABNORMAL_FILL = "FFC7CE"  # Status cells of meters flagged by the year-over-year check
+MASTER_BANDS = ("DAECF9", "B9D9F7")  # alternating fills, one per building block
+
+
+def write_master_workbook(master_data, master_path, statuses=None):
+    """Write the Final workbook: one banded block of Building / Meter / Usage rows per building.
+
+    Buildings come out in sorted order with a blank row above and below each block. Usage stays a
+    number (shown with NUMBER_FORMAT), and the bands and column widths are worked out from the
+    rows in memory so the sheet is streamed out in one pass. When any meter was checked for
+    missing intervals, Readings / Expected / Completeness columns show its interval counts.
+    `statuses` (one per row of master_data) adds a Status column from the year-over-year check.
+    """
+    show_intervals = any(master_data.expected)
+    headers = MASTER_HEADERS + (INTERVAL_HEADERS if show_intervals else []) + (["Status"] if statuses is not None else [])
+    groups = {}
+    for idx, (building, meter, usage) in enumerate(master_data):
+        row = [meter, usage]
+        if show_intervals:
+            expected, actual = master_data.expected[idx], master_data.actual[idx]
+            row += [actual, expected, actual / expected] if expected else [None, None, None]
+        if statuses is not None:
+            row.append(statuses[idx])
+        groups.setdefault(building, []).append(row)
+
+    usage_style = CellStyle(number_format=NUMBER_FORMAT, horizontal="right", vertical="center")
+    # Style of each column after Building for the rows of a band, plain text where None
+    column_styles = [None, usage_style] + ([COUNT_STYLE, COUNT_STYLE, PERCENT_STYLE] if show_intervals else [])
+    band_styles = [[(style or CellStyle())._replace(fill=color) for style in column_styles] for color in MASTER_BANDS]
+    text_bands = [CellStyle(fill=color) for color in MASTER_BANDS]
+    abnormal_style = CellStyle(fill=ABNORMAL_FILL)
+    spacer = [None, None] + [(None, style) for style in column_styles[1:]]
+
+    def styled_rows():
+        yield [headers[0], headers[1]] + [(header, style._replace(number_format=None))
+                                          for header, style in zip(headers[2:], column_styles[1:])] + headers[len(column_styles) + 1:]
+        for band, building in enumerate(sorted(groups)):
+            text_style, styles = text_bands[band % 2], band_styles[band % 2]
+            yield spacer
+            for values in groups[building]:
+                row = [(building, text_style)] + [(value, style) for value, style in zip(values, styles)]
+                if statuses is not None:
+                    status = values[-1]
+                    row.append((status, abnormal_style if status.startswith(("high", "low")) else text_style))
+                yield row
+            yield spacer
+
+    # Widths: longest displayed value per column, plus 1. A number shown with its format only gets
+    # longer with its size, so the largest and smallest of a number column are all that's measured.
+    shown = [None, "{:,.2f}"] + (["{:,}", "{:,}", "{:.1%}"] if show_intervals else [])
+    columns = [[[header]] for header in headers]
+    columns[0].append(list(groups))
+    for c in range(len(headers) - 1):
+        values = [row[c] for rows in groups.values() for row in rows if row[c] is not None]
+        if c < len(shown) and shown[c] and values:
+            values = [shown[c].format(value) for value in (max(values), min(values))]
+        columns[c + 1].append(values)
+    write_streamed_workbook(master_path, styled_rows(), autofit_widths(columns, padding=1))
+
+
+def process_batch(file_paths, digests, results, intermediate_subfolder, today_str, bill_month, time_str, ledger):
+    """Run every export in `file_paths` into `intermediate_subfolder`; returns the worker count used.
+
+    Each export's (usage rows, intermediate file, timings) goes into `results` at its input position
+    as soon as it is done, so whatever finished is there even if the batch stops part way. An export
+    whose handler raises is left out and the first such error is raised once the rest are done. Exports
+    whose content hash (`digests`) is in `ledger` reuse their earlier results. The exports are left
+    in Pre-Updated; they are removed once the batch has been published.
+
+    Every export writes into a folder of its own and the files are moved into `intermediate_subfolder`
+    in input order at the end, so two exports that clean to the same building name (and so the same
+    file name) end up exactly as in a serial run, even when workers write them at the same time.
+    """
+    files = [os.path.basename(file_path) for file_path in file_paths]
+    work_root = os.path.join(intermediate_subfolder, ".exports")
+    work_folders = [os.path.join(work_root, str(idx)) for idx in range(len(files))]
+    for folder in work_folders:
+        os.makedirs(folder, exist_ok=True)
+    try:
+        return process_exports(file_paths, files, digests, results, work_folders, today_str, bill_month, time_str,
+                               ledger)
+    finally:
+        # Whatever finished moves into place, later exports replacing earlier ones of the same name
+        placed = {}
+        for idx, result in enumerate(results):
+            if result is None or result[1] is None:
+                continue
+            rows, output_path, timings = result
+            final_path = os.path.join(intermediate_subfolder, os.path.basename(output_path))
+            os.replace(output_path, final_path)
+            results[idx] = (rows, final_path, timings)
+            if final_path in placed:
+                # The earlier export's usage still goes into the master, but its file is gone
+                earlier = placed[final_path]
+                results[earlier] = results[earlier][:1] + (None,) + results[earlier][2:]
+                print(f"⚠️ {files[earlier]} and {files[idx]} both produce {os.path.basename(final_path)}; "
+                      f"only the one from {files[idx]} is kept.")
+                logging.warning(f"{files[earlier]} and {files[idx]} both produce {final_path}; "
+                                f"kept the one from {files[idx]}")
+            placed[final_path] = idx
+        shutil.rmtree(work_root, ignore_errors=True)
+
+
+def process_exports(file_paths, files, digests, results, work_folders, today_str, bill_month, time_str, ledger):
+    """process_batch without the final move: export `idx` writes into `work_folders[idx]`."""
+    processed = 0
+
+    # Exports that are byte-for-byte identical to one we've already handled reuse those results.
+    # Parsed forms of the exports are cached by the same hash, so a re-run skips the xlsx parsing
+    cache_paths = [os.path.join(PARSE_CACHE_FOLDER, f"{digest}.npz") for digest in digests]
+    for idx, (file, file_path, digest) in enumerate(zip(files, file_paths, digests)):
+        timer = StageTimer(file)
+        cached = reuse_ledger_entry(ledger.get(digest), clean_building_name(file),
+                                    work_folders[idx], today_str, time_str)
+        if cached is None:
+            continue
+        timer.mark("ledger_reuse")
+        results[idx] = cached + (timer.record(),)
+        processed += 1
+        print(f"♻️ {file} is unchanged since a previous run - reusing its results.")
+        print(f"📦 {processed}/{len(files)} files processed.")
+        logging.info(f"Processed file {processed}/{len(files)}: {file} (cached)")
+
+    pending = [idx for idx, result in enumerate(results) if result is None]
+    workers = max(1, min(MAX_WORKERS, len(pending)))
+
+    # An export whose handler raises doesn't stop the others; the first error is raised at the end
+    failure = None
+
+    def collect(idx, outcome):
+        nonlocal processed, failure
+        try:
+            results[idx] = outcome()
+        except Exception as e:
+            failure = failure or e
+            print(f"❌ {files[idx]} failed: {e}")
+            logging.exception(f"{files[idx]} failed: {e}")
+            return
+        processed += 1
+        print(f"📦 {processed}/{len(files)} files processed.")
+        logging.info(f"Processed file {processed}/{len(files)}: {files[idx]}")
+
+    if workers > 1:
+        # Fan files out to a process pool; results are stored by input position so master_data
+        # ends up exactly as a serial run would build it
+        from concurrent.futures import ProcessPoolExecutor
+
+        print(f"⚙️ Processing with {workers} worker processes.")
+        logging.info(f"Processing with {workers} worker processes.")
+        with ProcessPoolExecutor(max_workers=workers, initializer=setup_worker,
+                                 initargs=(LOG_QUEUE, READER_CHOICE)) as executor:
+            futures = [executor.submit(process_file, file_paths[idx], work_folders[idx], today_str, bill_month,
+                                       time_str, cache_paths[idx]) for idx in pending]
+            for idx, future in zip(pending, futures):
+                collect(idx, future.result)
+    else:
+        for idx in pending:
+            collect(idx, lambda: process_file(file_paths[idx], work_folders[idx], today_str, bill_month, time_str,
+                                              cache_paths[idx]))
+
+    if failure is not None:
+        raise failure
+    return workers
+
+
+def most_common_bill_month(file_names, time_str, default):
+    """Most frequent billing month among intermediate file names, or `default` if none carry one."""
+    from collections import Counter
+    month_counts = Counter()
+    for file in file_names:
+        match = re.search(rf"{time_str}_(\w+)_", file)
+        if match:
+            month_counts[match.group(1)] += 1
+    return month_counts.most_common(1)[0][0] if month_counts else default
+
+
+def build_final_workbook(master_data, now, master_path, timer):
+    """Run the year-over-year check on `master_data` and write it to `master_path`.
+
+    Returns the usage frame the check was run on, for record_usage_history.
+    """
+    # Compare every meter with the same month in earlier years before writing the master
+    current_usage = usage_frame(master_data, now)
+    usage_history = load_usage_history(current_usage)
+    statuses = detect_abnormal_usage(current_usage, usage_history)
+    flagged = sum(status.startswith(("high", "low")) for status in statuses)
+    timer.mark("abnormal_check")
+    if flagged:
+        print(f"🔎 {flagged} meters look abnormal compared to previous years - see the Status column.")
+        logging.info(f"{flagged} meters flagged by the year-over-year check")
+
+    write_master_workbook(master_data, master_path, statuses)
+    timer.mark("master_build")
+    return current_usage
+
+
+def remember_results(ledger, file_paths, digests, results, final_folder_path, today_str, time_str):
+    """Record where each export's results now live so an identical re-drop can skip processing.
+
+    An entry whose output file has just been replaced by another export's is dropped.
+    """
+    for file_path, digest, result in zip(file_paths, digests, results):
+        if result is None or result[1] is None:
+            continue  # never finished, its handler failed or another export replaced its file
+        rows, output_path, _ = result
+        file = os.path.basename(file_path)
+        output_name = os.path.basename(output_path)
+        output = os.path.join(final_folder_path, output_name)
+        for old_digest in [old for old, entry in ledger.items() if entry.get("output") == output and old != digest]:
+            del ledger[old_digest]
+        ledger[digest] = {
+            "file": file,
+            "building": clean_building_name(file),
+            "rows": rows.to_records(),
+            "output": output,
+            "name_suffix": output_name[len(f"{today_str}_{time_str}_"):],
+            "saved": today_str,
+        }
+
+
+def keep_finished_results(ledger, file_paths, digests, results, intermediate_subfolder, final_folder_path,
+                          today_str, time_str):
+    """Save what a run that stopped part way did finish, leaving every export in Pre-Updated.
+
+    The finished intermediate files are published to `final_folder_path` if they aren't there
+    already, or stay in the scratch folder when that fails too. Either way they go in the ledger,
+    so running again over the same exports reuses them instead of redoing the work.
+    """
+    location = final_folder_path
+    if os.path.isdir(intermediate_subfolder):
+        try:
+            publish_batch(intermediate_subfolder, final_folder_path)
+        except OSError as e:
+            location = intermediate_subfolder
+            logging.error(f"Could not publish the finished intermediate files: {e}")
+    remember_results(ledger, file_paths, digests, results, location, today_str, time_str)
+    save_ledger(ledger)
+    finished = sum(result is not None for result in results)
+    print(f"⚠️ Run stopped early: {finished}/{len(results)} finished exports are kept in {location}. "
+          f"Every export stays in Pre-Updated for the next run.")
+    logging.warning(f"Run stopped early: {finished}/{len(results)} finished exports kept in {location}")
+
+
+def main(startup_seconds=None):
+    run_started = time.perf_counter()
+    if PRE_UPDATED is None:
+        configure()
     now = datetime.now()
-    master_data = []
     today_str = now.strftime("%Y-%m-%d")
     time_str = now.strftime("%H-%M")
 
     bill_month = now.strftime("%B")
-    master_data = []
+    master_data = MasterData()
 
-    # Use TEMP name for now — will rename after processing files
+    # Work happens in a local scratch folder under a TEMP name; the finished batch is published
+    # to OneDrive in one move at the end
+    scratch_folder = tempfile.mkdtemp(prefix=f"{today_str}_{time_str}_", dir=SCRATCH_ROOT)
     intermediate_subfolder_name = f"{today_str}_{time_str}_TEMP"
-    intermediate_subfolder = os.path.join(INTERMEDIATE_FOLDER, intermediate_subfolder_name)
+    intermediate_subfolder = os.path.join(scratch_folder, intermediate_subfolder_name)
     os.makedirs(intermediate_subfolder, exist_ok=True)
 
-    files = [file for file in os.listdir(PRE_UPDATED) if file.endswith((".xls", ".xlsx"))]
+    files = [file for file in os.listdir(PRE_UPDATED) if file.endswith(EXPORT_EXTENSIONS)]
     print(f"📁 Found {len(files)} files in Pre-Updated folder.")
     logging.info(f"Found {len(files)} files in Pre-Updated folder.")
 
-    for idx, file in enumerate(files, start=1):
-        building = clean_building_name(file)
-        file_path = os.path.join(PRE_UPDATED, file)
+    file_paths = [os.path.join(PRE_UPDATED, file) for file in files]
+    digests = [file_digest(file_path) for file_path in file_paths]
+    results = [None] * len(files)  # (usage rows, intermediate file, timings) per input, in input order
+    ledger = load_ledger()
+    prune_parse_cache()
 
-        if re.match(r"^nitrogen\s+\d+[a-z]?$", os.path.splitext(file)[0].lower()):
-            handle_nitrogen_file(file_path, intermediate_subfolder, building, today_str, bill_month, time_str, master_data)
-        else:
-            format_excel(file_path, intermediate_subfolder, master_data, building, today_str, bill_month, time_str)
+    # Intermediate folder is published under a name that includes the most common billing month
+    def final_folder():
+        most_common_month = most_common_bill_month(os.listdir(intermediate_subfolder), time_str, bill_month)
+        return most_common_month, os.path.join(INTERMEDIATE_FOLDER, f"{today_str}_{time_str}_{most_common_month}")
 
+    try:
+        workers = process_batch(file_paths, digests, results, intermediate_subfolder, today_str, bill_month, time_str,
+                                ledger)
+    except BaseException:
+        keep_finished_results(ledger, file_paths, digests, results, intermediate_subfolder, final_folder()[1],
+                              today_str, time_str)
+        raise
+
+    for rows, _, _ in results:
+        master_data.extend(rows)
+    most_common_month, final_folder_path = final_folder()
+
+    master_timer = StageTimer("master")
+    master_timer.counts["rows"] = len(master_data)
+    master_filename = master_path = master_scratch_path = None
+    # One bulk move to OneDrive, then drop the (now empty) scratch folder
+    try:
+        if master_data:
+            master_filename = f"Final-{today_str}-{time_str}-{most_common_month}.xlsx"
+            master_path = os.path.join(OUTPUT_FOLDER, master_filename)
+            master_scratch_path = os.path.join(scratch_folder, master_filename)
+            current_usage = build_final_workbook(master_data, now, master_scratch_path, master_timer)
+        publish_batch(intermediate_subfolder, final_folder_path, master_scratch_path, master_path)
+    except BaseException:
+        keep_finished_results(ledger, file_paths, digests, results, intermediate_subfolder, final_folder_path,
+                              today_str, time_str)
+        raise
+    shutil.rmtree(scratch_folder, ignore_errors=True)
+    master_timer.mark("publish")
+    logging.info(f"Published intermediate files to {final_folder_path}")
+
+    # Only now that their results are on OneDrive do the exports leave Pre-Updated
+    for file_path in file_paths:
         os.remove(file_path)
-        print(f"📦 {idx}/{len(files)} files processed.")
-        logging.info(f"Processed file {idx}/{len(files)}: {file}")
-
-    # Determine most frequent billing month from intermediate file names
-    from collections import Counter
-    month_counts = Counter()
-    for file in os.listdir(intermediate_subfolder):
-        match = re.search(rf"{time_str}_(\w+)_", file)
-        if match:
-            month_counts[match.group(1)] += 1
-
-    if month_counts:
-        most_common_month = month_counts.most_common(1)[0][0]
-    else:
-        most_common_month = bill_month  # default to current month
-
-    # Rename intermediate folder to include most common billing month
-    final_folder_name = f"{today_str}_{time_str}_{most_common_month}"
-    final_folder_path = os.path.join(INTERMEDIATE_FOLDER, final_folder_name)
-    os.rename(intermediate_subfolder, final_folder_path)
-    intermediate_subfolder = final_folder_path  # update reference for later use
 
     if master_data:
-        df = pd.DataFrame(master_data, columns=["Building", "Meter", "Usage"])
-        df["Usage"] = df["Usage"].map(lambda x: f"{x:,.2f}")
-        grouped = df.groupby("Building")
-        final_rows = []
-        for name, group in grouped:
-            final_rows.append([None, None, None])  # Spacer row
-            final_rows.extend(group.values.tolist())
-            final_rows.append([None, None, None])  # Spacer row
-
-        styled_df = pd.DataFrame(final_rows, columns=["Building", "Meter", "Usage"])
-        master_filename = f"Final-{today_str}-{time_str}-{most_common_month}.xlsx"
-        master_path = os.path.join(OUTPUT_FOLDER, master_filename)
-
-        with pd.ExcelWriter(master_path, engine="openpyxl") as writer:
-            styled_df.to_excel(writer, index=False)
-            sheet = writer.sheets['Sheet1']
-
-            color1 = "DAECF9"
-            color2 = "B9D9F7"
-            current_fill = color1
-            start = 2  # Skip header
-
-            while start <= sheet.max_row:
-                building_name = sheet.cell(row=start, column=1).value
-                if not building_name:
-                    start += 1
-                    continue
-
-                # Apply fill color block
-                end = start
-                while end <= sheet.max_row and sheet.cell(row=end, column=1).value:
-                    end += 1
-                for r in range(start, end):
-                    for c in range(1, 3 + 1):
-                        sheet.cell(row=r, column=c).fill = PatternFill(start_color=current_fill, end_color=current_fill, fill_type="solid")
-                current_fill = color2 if current_fill == color1 else color1
-                start = end + 1
-
-            # Adjust column widths and align Usage column to the right
-            for column_cells in sheet.columns:
-                col_letter = get_column_letter(column_cells[0].column)
-                max_length = max(len(str(cell.value)) if cell.value else 0 for cell in column_cells)
-                sheet.column_dimensions[col_letter].width = max_length + 1
-
-                for cell in column_cells:
-                    if column_cells[0].column == 3:  # Column C = "Usage"
-                        cell.alignment = Alignment(horizontal="right", vertical="center")
-
         print(f"✅ Master Excel file saved: {master_filename}")
         logging.info(f"Master Excel file saved: {master_filename} - {master_path}")
 
-
-if __name__ == "__main__":
-    main()
-    input("Press Enter to exit...")
+    remember_results(ledger, file_paths, digests, results, final_folder_path, today_str, time_str)
+    if files:
+        save_ledger(ledger)
+    if master_data:
+        record_usage_history(current_usage, f"{today_str}_{time_str}")
+
+    run = {
+        "run": f"{today_str}_{time_str}",
+        "seconds": round(time.perf_counter() - run_started, 4),
+        "startup_seconds": startup_seconds,
+        "workers": workers,
+        "files": [timings for _, _, timings in results],
+        "master": master_timer.record(),
+    }
+    save_run_metrics(run)
+    report_run_metrics(run)
+
+
+class ArrivalWatcher:
+    """Spots exports in a folder once they have finished arriving.
+
+    A file is ready when its size and modified time have stayed the same for `settle` seconds and it
+    can be opened for writing (Excel and the OneDrive client keep it locked while still writing it).
+    """
+
+    def __init__(self, settle):
+        self.settle = settle
+        self.seen = {}  # path -> ((size, mtime), when that signature was first seen)
+        self.skipped = {}  # path -> signature of a file that failed; retried only once it changes
+
+    def poll(self, folder):
+        now = time.monotonic()
+        seen = {}
+        ready = []
+        for file in os.listdir(folder):
+            # "~$" files are Excel's lock files for a workbook someone has open
+            if not file.endswith(EXPORT_EXTENSIONS) or file.startswith("~$"):
+                continue
+            path = os.path.join(folder, file)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # removed since the listing
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self.seen.get(path)
+            since = previous[1] if previous and previous[0] == signature else now
+            seen[path] = (signature, since)
+            if self.skipped.get(path) == signature or not stat.st_size or now - since < self.settle:
+                continue
+            try:
+                with open(path, "r+b"):
+                    pass
+            except OSError:
+                continue  # still locked by whatever is writing it
+            ready.append(path)
+        self.seen = seen
+        self.skipped = {path: signature for path, signature in self.skipped.items() if path in seen}
+        return sorted(ready)
+
+    def skip(self, paths):
+        """Leave `paths` alone until their contents change."""
+        for path in paths:
+            if path in self.seen:
+                self.skipped[path] = self.seen[path][0]
+
+
+class WatchSession:
+    """One calendar month of watch mode: an Intermediate folder and a Final workbook that grow as exports land."""
+
+    def __init__(self, now):
+        self.month = now.strftime("%Y-%m")
+        self.bill_month = now.strftime("%B")
+        self.today_str = now.strftime("%Y-%m-%d")
+        self.time_str = now.strftime("%H-%M")
+        self.final_folder_path = os.path.join(INTERMEDIATE_FOLDER, f"{self.today_str}_{self.time_str}_Watch")
+        self.results = {}  # export name -> (usage rows, intermediate file name), in arrival order
+        self.master_path = None
+
+    def add(self, file_paths, ledger):
+        """Process newly arrived exports, publish them and refresh the Final workbook.
+
+        Only the new exports are processed; the workbook is rebuilt from the usage rows kept for
+        every export of the session. An export dropped again replaces its earlier results.
+        """
+        run_started = time.perf_counter()
+        run_name = f"{datetime.now():%Y-%m-%d_%H-%M}"
+        scratch_folder = tempfile.mkdtemp(prefix=f"{run_name}_", dir=SCRATCH_ROOT)
+        intermediate_subfolder = os.path.join(scratch_folder, "Intermediate")
+        os.makedirs(intermediate_subfolder)
+
+        digests = [file_digest(file_path) for file_path in file_paths]
+        results = [None] * len(file_paths)
+        try:
+            workers = process_batch(file_paths, digests, results, intermediate_subfolder, self.today_str,
+                                    self.bill_month, self.time_str, ledger)
+        finally:
+            # Whatever finished is published and remembered even if the batch stopped part way
+            self.publish(file_paths, digests, results, ledger)
+
+        master_data = MasterData()
+        for rows, _ in self.results.values():
+            master_data.extend(rows)
+        master_timer = StageTimer("master")
+        master_timer.counts["rows"] = len(master_data)
+        if master_data:
+            output_names = [name for _, name in self.results.values() if name]
+            month = most_common_bill_month(output_names, self.time_str, self.bill_month)
+            master_filename = f"Final-{self.today_str}-{self.time_str}-{month}.xlsx"
+            master_path = os.path.join(OUTPUT_FOLDER, master_filename)
+            master_scratch_path = os.path.join(scratch_folder, master_filename)
+            current_usage = build_final_workbook(master_data, datetime.now(), master_scratch_path, master_timer)
+
+            if os.path.exists(master_path):
+                os.remove(master_path)
+            shutil.move(master_scratch_path, master_path)
+            # The workbook is renamed when the most common billing month changes
+            if self.master_path not in (None, master_path) and os.path.exists(self.master_path):
+                os.remove(self.master_path)
+            self.master_path = master_path
+            master_timer.mark("publish")
+            print(f"✅ Master Excel file refreshed: {master_filename} ({len(self.results)} exports)")
+            logging.info(f"Master Excel file refreshed: {master_filename} - {master_path}")
+            record_usage_history(current_usage, run_name)
+        shutil.rmtree(scratch_folder, ignore_errors=True)
+
+        run = {
+            "run": run_name,
+            "seconds": round(time.perf_counter() - run_started, 4),
+            "workers": workers,
+            "watch": True,
+            "files": [timings for _, _, timings in results],
+            "master": master_timer.record(),
+        }
+        save_run_metrics(run)
+        report_run_metrics(run)
+
+    def publish(self, file_paths, digests, results, ledger):
+        """Move the finished exports' intermediate files into the session folder and record them.
+
+        An export leaves Pre-Updated only once its results are in the session; ones that never
+        finished stay put.
+        """
+        os.makedirs(self.final_folder_path, exist_ok=True)
+        published = []
+        for file_path, result in zip(file_paths, results):
+            if result is None:
+                continue
+            rows, output_path, _ = result
+            output_name = os.path.basename(output_path) if output_path else None
+            if output_name:
+                final_path = os.path.join(self.final_folder_path, output_name)
+                if os.path.exists(final_path):
+                    os.remove(final_path)
+                shutil.move(output_path, final_path)
+            self.results[os.path.basename(file_path)] = (rows, output_name)
+            published.append(file_path)
+        logging.info(f"Published {len(published)} intermediate files to {self.final_folder_path}")
+
+        remember_results(ledger, file_paths, digests, results, self.final_folder_path, self.today_str, self.time_str)
+        save_ledger(ledger)
+        for file_path in published:
+            os.remove(file_path)
+
+
+def watch(settle=WATCH_SETTLE, interval=WATCH_INTERVAL):
+    """Process exports as they land in Pre-Updated until stopped with Ctrl+C.
+
+    Each batch of settled exports goes through the same handlers as a normal run and the session's
+    Final workbook is refreshed straight after. A new session starts when the calendar month changes.
+    """
+    if PRE_UPDATED is None:
+        configure()
+    prune_parse_cache()
+    arrivals = ArrivalWatcher(settle)
+    session = None
+    print(f"👀 Watching {PRE_UPDATED} for new exports (Ctrl+C to stop).")
+    logging.info(f"Watching {PRE_UPDATED} for new exports")
+    try:
+        while True:
+            ready = arrivals.poll(PRE_UPDATED)
+            if ready:
+                now = datetime.now()
+                if session is None or session.month != now.strftime("%Y-%m"):
+                    session = WatchSession(now)
+                print(f"📥 {len(ready)} new export(s) ready.")
+                logging.info(f"{len(ready)} new exports ready: {', '.join(map(os.path.basename, ready))}")
+                try:
+                    session.add(ready, load_ledger())
+                except Exception as e:
+                    # Keep watching; exports that finished were published (the Final workbook catches up
+                    # with the next batch) and the rest are retried once they change
+                    arrivals.skip(ready)
+                    print(f"❌ Could not process the new exports: {e}")
+                    logging.exception(f"Watch batch failed: {e}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("👋 Stopped watching.")
+        logging.info("Stopped watching")
 
 
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+    freeze_support()  # needed for worker processes in the PyInstaller exe
+    args = parse_args()
+    configure(args.onedrive, args.workers, args.scratch, args.data)
+    if args.abnormal_change is not None:
+        ABNORMAL_HIGH = ABNORMAL_LOW = args.abnormal_change
+    if args.history:
+        history = meter_history(args.history)
+        print(history.to_string(index=False) if len(history) else f"No history recorded for meter {args.history}.")
+        raise SystemExit
+    if args.pick_reader:
+        samples = [os.path.join(PRE_UPDATED, file) for file in os.listdir(PRE_UPDATED) if file.endswith((".xls", ".xlsx"))]
+        if not samples:
+            print("❌ Put a few exports in Pre-Updated to time the readers on.")
+            raise SystemExit(1)
+        for extension, times in pick_reader_engines(samples).items():
+            ranked = sorted(times.items(), key=lambda item: item[1])
+            print(f"{extension}: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in ranked))
+        whole_sheet = [name for name, engine in READER_ENGINES.items()
+                       if not engine.streams and module_installed(engine.module)]
+        if whole_sheet:
+            print(f"ℹ️ {' and '.join(whole_sheet)} load the whole sheet into memory, which is why they can be faster; "
+                  f"exports over {STREAMING_READ_BYTES // (1024 * 1024)} MB are still read by a streaming engine "
+                  f"(openpyxl) first.")
+        print(f"✅ Reader ranking saved to {READER_CHOICE_PATH}")
+        raise SystemExit
+
+    startup_seconds = time.perf_counter() - STARTED
+    print(f"🚀 Ready in {startup_seconds:.2f}s")
+    logging.info(f"Startup took {startup_seconds:.3f}s")
+    if startup_seconds > STARTUP_BUDGET:
+        logging.warning(f"Startup took longer than the {STARTUP_BUDGET:.1f}s budget")
+
+    if args.watch:
+        watch(args.settle)
+    else:
+        main(startup_seconds)
+        if not args.no_pause:
+            input("Press Enter to exit...")
@@ -0,0 +1,30 @@
+import pandas as pd
+
+import main
+
+
+def usage_rows(rows):
+    return pd.DataFrame(rows, columns=["building", "meter", "usage", "period"])
+
+
+def statuses(usage, past_usage):
+    current = usage_rows([("Alpha", "01.01ME1", usage, "2025-06")])
+    history = usage_rows([("Alpha", "01.01ME1", value, f"{2024 - k}-06") for k, value in enumerate(past_usage)])
+    return main.detect_abnormal_usage(current, history)
+
+
+def test_high_and_low():
+    assert statuses(200, [100, 100]) == ["high (+100% vs prior years)"]
+    assert statuses(40, [100]) == ["low (-60% vs prior years)"]
+    assert statuses(120, [100]) == ["normal"]
+
+
+def test_negative_baseline_keeps_direction():
+    # A cogen meter that used to export (negative usage) and now imports went up, not down
+    assert statuses(10, [-50]) == ["high (+120% vs prior years)"]
+    assert statuses(-100, [-50]) == ["low (-100% vs prior years)"]
+
+
+def test_no_history():
+    assert statuses(100, []) == ["no history"]
+    assert statuses(100, [0.5]) == ["no history"]  # baseline too small to compare against
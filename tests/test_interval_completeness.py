@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import main
+
+
+def quarter_hours(start, end):
+    return pd.date_range(start, end, freq="15min")
+
+
+def test_complete_export():
+    times = quarter_hours("2025-06-01 00:15", "2025-06-02 00:00")
+    result = main.interval_completeness(times, np.zeros((len(times), 2), dtype=bool))
+    assert result["interval"] == pd.Timedelta(minutes=15)
+    assert result["expected"].tolist() == [96, 96]
+    assert result["actual"].tolist() == [96, 96]
+    assert result["interior"].tolist() == [0, 0]
+    assert result["gaps"] == []
+
+
+def test_blank_cells_leading_interior_and_trailing():
+    times = quarter_hours("2025-06-01 00:15", "2025-06-02 00:00")
+    missing = np.zeros((len(times), 3), dtype=bool)
+    missing[:2, 0] = True  # no reading until 00:45
+    missing[40:43, 1] = True  # three blank readings mid-day
+    missing[-1, 2] = True  # last reading blank
+    result = main.interval_completeness(times, missing)
+    assert result["actual"].tolist() == [94, 93, 95]
+    assert result["interior"].tolist() == [0, 3, 0]  # only gaps between readings count as interior
+    assert result["gaps"] == [
+        main.IntervalGap(0, datetime(2025, 6, 1, 0, 15), datetime(2025, 6, 1, 0, 30), 2),
+        main.IntervalGap(1, datetime(2025, 6, 1, 10, 15), datetime(2025, 6, 1, 10, 45), 3),
+        main.IntervalGap(2, datetime(2025, 6, 2, 0, 0), datetime(2025, 6, 2, 0, 0), 1),
+    ]
+
+
+def test_rows_missing_from_the_export():
+    times = quarter_hours("2025-06-01 00:15", "2025-06-02 00:00")
+    times = times[(times < "2025-06-01 06:00") | (times >= "2025-06-01 07:00")]
+    result = main.interval_completeness(times, np.zeros((len(times), 1), dtype=bool))
+    assert result["expected"].tolist() == [96]
+    assert result["actual"].tolist() == [92]
+    assert result["interior"].tolist() == [4]
+    assert result["gaps"] == [main.IntervalGap(0, datetime(2025, 6, 1, 6, 0), datetime(2025, 6, 1, 6, 45), 4)]
+
+
+def test_unparsed_timestamps_and_empty_meter():
+    times = pd.DatetimeIndex(["2025-06-01 00:15", "NaT", "2025-06-01 00:45", "2025-06-01 01:00"])
+    missing = np.array([[False, True], [False, True], [False, True], [False, True]])
+    result = main.interval_completeness(times, missing)
+    assert result["expected"].tolist() == [4, 4]
+    assert result["actual"].tolist() == [3, 0]  # the row that didn't parse leaves its slot empty
+    assert result["interior"].tolist() == [1, 0]
+    assert result["gaps"][-1] == main.IntervalGap(1, datetime(2025, 6, 1, 0, 15), datetime(2025, 6, 1, 1, 0), 4)
+
+
+def test_no_interval_without_two_timestamps():
+    result = main.interval_completeness(pd.DatetimeIndex(["2025-06-01 00:15"]), np.zeros((1, 1), dtype=bool))
+    assert result["interval"] is None
+    assert result["gaps"] == []
+
+
+def test_spring_forward_hour_is_not_missing():
+    # Local-time export: the clocks go from 02:00 to 03:00 on 9 March 2025, so those rows never exist
+    times = quarter_hours("2025-03-09 00:15", "2025-03-10 00:00")
+    times = times[(times < "2025-03-09 02:00") | (times >= "2025-03-09 03:00")]
+    result = main.interval_completeness(times, np.zeros((len(times), 2), dtype=bool))
+    assert result["expected"].tolist() == [92, 92]
+    assert result["actual"].tolist() == [92, 92]
+    assert result["interior"].tolist() == [0, 0]
+    assert result["gaps"] == []
+
+
+def test_gap_across_the_spring_forward_hour():
+    times = quarter_hours("2025-03-09 00:15", "2025-03-10 00:00")
+    times = times[(times < "2025-03-09 02:00") | (times >= "2025-03-09 03:00")]
+    missing = np.asarray((times >= "2025-03-09 01:00") & (times < "2025-03-09 04:00"))[:, None]
+    result = main.interval_completeness(times, missing)
+    assert result["interior"].tolist() == [8]
+    assert result["gaps"] == [main.IntervalGap(0, datetime(2025, 3, 9, 1, 0), datetime(2025, 3, 9, 3, 45), 8)]
+
+
+def test_standard_time_export_keeps_the_hour():
+    # An export stamped in standard time all year does have the 02:00 rows, and they are expected
+    times = quarter_hours("2025-03-09 00:15", "2025-03-10 00:00")
+    times = times[(times < "2025-03-09 02:15") | (times >= "2025-03-09 02:30")]
+    result = main.interval_completeness(times, np.zeros((len(times), 1), dtype=bool))
+    assert result["expected"].tolist() == [96]
+    assert result["gaps"] == [main.IntervalGap(0, datetime(2025, 3, 9, 2, 15), datetime(2025, 3, 9, 2, 15), 1)]
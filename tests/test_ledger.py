@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def ledger_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "processed_ledger.json")
+    monkeypatch.setattr(main, "LEDGER_PATH", path)
+    return path
+
+
+def entry(output, saved):
+    return {"file": "Alpha.xlsx", "building": "Alpha", "rows": {}, "output": str(output),
+            "name_suffix": "June_Alpha.xlsx", "saved": saved}
+
+
+def test_load_drops_stale_and_missing_outputs(ledger_path, tmp_path):
+    output = tmp_path / "June_Alpha.xlsx"
+    output.write_bytes(b"")
+    today = date.today().isoformat()
+    old = (date.today() - timedelta(days=main.LEDGER_DAYS + 1)).isoformat()
+    main.save_ledger({
+        "kept": entry(output, today),
+        "old": entry(output, old),
+        "gone": entry(tmp_path / "deleted.xlsx", today),
+        "unsaved": {key: value for key, value in entry(output, today).items() if key != "saved"},
+    })
+    assert list(main.load_ledger()) == ["kept"]
+
+
+def test_remember_drops_entries_whose_output_was_replaced(tmp_path):
+    rows = main.MasterData()
+    rows.append("Building Cogen", "01.01ME1", 5.0)
+    output = str(tmp_path / "2025-07-02_09-30_June_Building Cogen.xlsx")
+    ledger = {"earlier": entry(output, "2025-07-01")}
+    main.remember_results(ledger, ["Building 5 Cogen.xlsx"], ["later"], [(rows, output, {})], str(tmp_path),
+                          "2025-07-02", "09-30")
+    assert list(ledger) == ["later"]
+    assert ledger["later"]["saved"] == "2025-07-02"
+    assert ledger["later"]["name_suffix"] == "June_Building Cogen.xlsx"
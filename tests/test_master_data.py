@@ -0,0 +1,49 @@
+import pickle
+from datetime import date
+
+import main
+
+
+def sample():
+    rows = main.MasterData()
+    rows.append("Alpha", "01.01ME1", 10.5, "Alpha.xlsx", "June", "complete", 2880, 2880)
+    rows.append("Alpha", "01.01ME2", 3.0, "Alpha.xlsx", "June", "gaps", 2880, 2870)
+    return rows
+
+
+def test_to_frame():
+    frame = sample().to_frame()
+    assert frame["meter"].tolist() == ["01.01ME1", "01.01ME2"]
+    assert frame["usage"].tolist() == [10.5, 3.0]
+    assert frame["status"].tolist() == ["complete", "gaps"]
+    assert frame["actual"].tolist() == [2880, 2870]
+
+
+def test_append_while_a_frame_is_alive():
+    rows = sample()
+    frame = rows.to_frame()
+    rows.append("Beta", "02.01ME1", 7.0)
+    assert len(rows) == 3 and len(frame) == 2
+
+
+def test_extend_remaps_codes_after_a_round_trip():
+    merged = main.MasterData()
+    merged.append("Beta", "02.01ME1", 7.0, status="complete")
+    merged.extend(pickle.loads(pickle.dumps(sample())))
+    assert list(merged) == [("Beta", "02.01ME1", 7.0), ("Alpha", "01.01ME1", 10.5), ("Alpha", "01.01ME2", 3.0)]
+    assert merged.to_frame()["status"].tolist() == ["complete", "complete", "gaps"]
+
+
+def test_usage_frame_period_from_the_readings():
+    rows = main.MasterData()
+    rows.append("Alpha", "01.01ME1", 10.5, "Alpha.xlsx", "June", "complete", 2880, 2880, "2025-06")
+    rows.append("Beta", "02.01ME1", 7.0, "Beta.xlsx", "June", "complete")  # no timestamp parsed
+    frame = main.usage_frame(rows, date(2026, 7, 2))
+    assert frame["period"].tolist() == ["2025-06", "2026-06"]
+
+
+def test_records_round_trip():
+    rows = sample()
+    rows.append("Alpha", "01.01ME3", 1.0, "Alpha.xlsx", "June", "complete", 2880, 2880, "2025-06")
+    assert main.MasterData.from_records(rows.to_records()).to_records() == rows.to_records()
+    assert rows.to_records()[-1][-1] == "2025-06"
@@ -0,0 +1,53 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import main
+
+
+@pytest.fixture
+def history_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "meter_history.sqlite")
+    monkeypatch.setattr(main, "HISTORY_PATH", path)
+    return path
+
+
+def usage_rows(rows):
+    return pd.DataFrame(rows, columns=["building", "meter", "usage", "period", "status", "source_file"])
+
+
+def test_meter_id():
+    assert main.meter_id("06.06ME1 Main Feed (kWh)") == "06.06ME1"
+    assert main.meter_id("06.06ME1") == "06.06ME1"
+    assert main.meter_id(" 12T1Q1 IESO (kWh)") == "12T1Q1"
+    assert main.meter_id("Nitrogen Tank A ") == "Nitrogen Tank A"
+
+
+def test_lookup_by_id_or_full_label(history_path):
+    main.record_usage_history(usage_rows([
+        ("Alpha", "06.06ME1 Main Feed (kWh)", 120.0, "2025-05", "complete", "Alpha.xlsx"),
+        ("Alpha", "06.06ME2 Chiller (kWh)", 80.0, "2025-05", "complete", "Alpha.xlsx"),
+    ]), "2025-06-02_09-30")
+    main.record_usage_history(usage_rows([
+        ("Alpha", "06.06ME1 Main Feed (kWh)", 130.0, "2025-06", "complete", "Alpha.xlsx"),
+    ]), "2025-07-02_09-30")
+
+    by_id = main.meter_history("06.06ME1")
+    assert by_id["month"].tolist() == ["2025-05", "2025-06"]
+    assert by_id["usage"].tolist() == [120.0, 130.0]
+    assert main.meter_history("06.06ME1 Main Feed (kWh)").equals(by_id)
+    assert main.meter_history("06.06ME1", building="Beta").empty
+
+
+def test_older_database_gets_meter_ids(history_path):
+    connection = sqlite3.connect(history_path)
+    connection.execute("""CREATE TABLE meter_usage (building TEXT NOT NULL, meter TEXT NOT NULL, month TEXT NOT NULL,
+                          usage REAL NOT NULL, status TEXT, source_file TEXT, run TEXT,
+                          PRIMARY KEY (building, meter, month))""")
+    connection.execute("INSERT INTO meter_usage VALUES ('Alpha', '00.01ME1 Meter 1 (kWh)', '2025-05', 42.0, "
+                       "'complete', 'Alpha.xlsx', '2025-06-02_09-30')")
+    connection.commit()
+    connection.close()
+
+    assert main.meter_history("00.01ME1")["usage"].tolist() == [42.0]
@@ -0,0 +1,74 @@
+import numpy as np
+
+import main
+
+nan = np.nan
+
+
+def usage_of(columns, is_cogen=False):
+    # Columns of readings (padded with NaN to the same height) through compute_meter_usage
+    height = max(len(column) for column in columns)
+    readings = np.array([list(column) + [nan] * (height - len(column)) for column in columns], dtype=float).T
+    return main.compute_meter_usage(readings, is_cogen)
+
+
+def test_plain_usage():
+    result = usage_of([[100, 110, 125], [5.5, 6.0, 7.25]])
+    assert result["usage"].tolist() == [25, 1.75]
+    assert result["rollovers"].tolist() == [0, 0] and result["resets"].tolist() == [0, 0]
+    assert result["events"] == []
+
+
+def test_single_rollover_matches_the_scalar_rounding():
+    column = [99_950, 99_980, 99_995, 20, 60]
+    result = usage_of([column])
+    # The per-cell loop this replaced: rounded register at the flip, minus the first, plus the last
+    old = main.round_to_nearest_power_of_10(99_995, False) - column[0] + column[-1]
+    assert old == 110
+    assert result["usage"].tolist() == [old]
+    assert result["flip_value"].tolist() == [99_995]
+    assert result["rollovers"].tolist() == [1] and result["resets"].tolist() == [0]
+    assert result["events"] == [main.RegisterEvent(0, 3, "rollover", 99_995, 20)]
+
+
+def test_two_rollovers():
+    result = usage_of([[900, 990, 10, 500, 995, 5, 20]])
+    assert result["usage"].tolist() == [20 - 900 + 1000 + 1000]
+    assert result["rollovers"].tolist() == [2]
+    assert [event.row for event in result["events"]] == [2, 5]
+
+
+def test_reset():
+    # 5,200 is nowhere near a full 10,000 register, so the drop is a reset and the lost 5,200 is added
+    result = usage_of([[5000, 5200, 300, 400]])
+    assert result["usage"].tolist() == [400 - 5000 + 5200]
+    assert result["resets"].tolist() == [1] and result["rollovers"].tolist() == [0]
+    assert result["events"] == [main.RegisterEvent(0, 2, "reset", 5200, 300)]
+
+
+def test_zero_glitch_is_not_an_event():
+    result = usage_of([[1000, 1010, 0, 1020, 1030]])
+    assert result["usage"].tolist() == [30]
+    assert result["events"] == []
+
+
+def test_cogen_counts_a_rollover_only_when_ending_higher():
+    # Rounded down for cogen: 990 -> 900
+    old = main.round_to_nearest_power_of_10(990, True) - 50 + 80
+    result = usage_of([[50, 990, 20, 80], [99_900, 99_990, 50, 120]], is_cogen=True)
+    assert result["usage"].tolist() == [old, 120 - 99_900]
+    assert result["rollovers"].tolist() == [1, 0]
+
+
+def test_nan_gaps():
+    result = usage_of([[nan, 100, nan, 150, nan], [99_990, nan, 10, 20], [nan, 42], []])
+    assert result["valid"].tolist() == [True, True, False, False]
+    assert result["first_idx"][0] == 1 and result["last_idx"][0] == 3
+    assert result["usage"][:2].tolist() == [50, 20 - 99_990 + 100_000]
+    assert result["events"] == [main.RegisterEvent(1, 2, "rollover", 99_990, 10)]
+
+
+def test_no_rows():
+    result = main.compute_meter_usage(np.empty((0, 2)), False)
+    assert result["valid"].tolist() == [False, False]
+    assert result["events"] == []
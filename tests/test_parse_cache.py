@@ -0,0 +1,37 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+import main
+
+
+def sample():
+    head_rows = [["Meter report", None], ["Time", "00.01ME1 Meter 1 (kWh)"]]
+    timestamps = [datetime(2025, 6, 1, 0, 15), "2025-06-01 00:30", None, 3.5]
+    readings = np.array([[100.0], [101.5], [np.nan], [103.0]])
+    return main.ExportData(head_rows, timestamps, readings, {(4, 0): "Total", (4, 1): 12})
+
+
+def test_round_trip(tmp_path):
+    cache_path = str(tmp_path / "digest.npz")
+    main.save_parsed_export(cache_path, sample())
+    export = main.load_parsed_export(cache_path)
+    assert export.head_rows == sample().head_rows
+    assert export.timestamps == sample().timestamps
+    np.testing.assert_array_equal(export.readings, sample().readings)
+    assert export.text_cells == sample().text_cells
+    assert os.listdir(tmp_path) == ["digest.npz"]
+
+
+def test_missing_entry(tmp_path):
+    assert main.load_parsed_export(str(tmp_path / "digest.npz")) is None
+
+
+def test_truncated_entry_is_discarded(tmp_path):
+    cache_path = str(tmp_path / "digest.npz")
+    main.save_parsed_export(cache_path, sample())
+    with open(cache_path, "r+b") as f:
+        f.truncate(500)
+    assert main.load_parsed_export(cache_path) is None
+    assert not os.path.exists(cache_path)
@@ -0,0 +1,34 @@
+import math
+
+import main
+
+
+def write_export(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_reads_readings_and_text(tmp_path):
+    path = write_export(tmp_path / "Alpha.csv", [
+        "Report,Alpha",
+        "Timestamp,Meter 1 (kWh),Meter 2 (kWh)",
+        "2025-06-01 00:15,100,5.5",
+        "2025-06-01 00:30,101,n/a",
+        "2025-06-01 00:45,102,Offline",
+    ])
+    export = main.read_delimited_export(path)
+    assert export.head_rows[-1] == ["Timestamp", "Meter 1 (kWh)", "Meter 2 (kWh)"]
+    assert export.timestamps == ["2025-06-01 00:15", "2025-06-01 00:30", "2025-06-01 00:45"]
+    assert export.readings[:, 0].tolist() == [100, 101, 102]
+    assert export.readings[0, 1] == 5.5 and math.isnan(export.readings[1, 1])
+    assert export.text_cells == {(2, 1): "Offline"}
+
+
+def test_chunk_of_only_blank_lines(tmp_path, monkeypatch):
+    # Five data rows fill the first chunk exactly, so the second chunk is just the blank lines
+    monkeypatch.setattr(main, "CSV_CHUNK_ROWS", 5)
+    path = write_export(tmp_path / "Beta.csv", ["Timestamp,Meter 1"]
+                        + [f"2025-06-01 0{hour}:00,{hour}" for hour in range(5)] + ["", ""])
+    export = main.read_delimited_export(path)
+    assert len(export.timestamps) == 5
+    assert export.readings[:, 0].tolist() == [0, 1, 2, 3, 4]